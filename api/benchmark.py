@@ -0,0 +1,811 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the search API.
+
+search: seeds a Qdrant stand-in with synthetic H&M-shaped points and fires
+concurrent /api/py/search requests at the app to compare the blocking client
+(the old behaviour) against the non-blocking AsyncQdrantClient path. By default
+the stand-in is an in-memory Qdrant with a simulated network round trip of
+--latency-ms; pass --url to run against a local docker Qdrant.
+
+    python api/benchmark.py search --concurrency 32 --requests 512 --latency-ms 20
+
+pages: latency of fetching page N of a vector search with integer offsets
+versus continuation cursors. The in-memory stand-in models Qdrant's cost of
+materializing skipped results with --per-result-us; --url measures it for real.
+
+    python api/benchmark.py pages --depths 1 10 50 100 --limit 20
+
+embed: sends a burst of concurrent queries through inline per-request
+encoding and through the micro-batching EmbeddingScheduler and reports
+embeddings/sec. Uses the real CLIP text model unless --fake-encoder is set.
+
+    python api/benchmark.py embed --concurrency 64 --requests 1024
+
+load: reproducible regression suite. Seeds the stand-in with a fixed-seed
+catalog of --points (10k, 100k or 1M), pins the text encoder to a
+deterministic fake and drives text search, filter-only search, deep-offset
+search, /groups and /featured at --concurrency. Writes throughput and
+p50/p95/p99 per scenario as JSON, so runs from two commits can be diffed.
+1M points needs several GB of RAM in memory; use --url with a local docker
+Qdrant (and --skip-seed on repeated runs) for the larger sizes.
+
+    python api/benchmark.py load --points 10000 --output bench-$(git rev-parse --short HEAD).json
+    python api/benchmark.py load --points 1000000 --url http://localhost:6333 --skip-seed
+
+coldstart: import time of the app module in a fresh interpreter, and for a
+freshly spawned uvicorn server the time to the first response on / and to
+/ready reporting 200 (collection verified, encoder loaded and warm).
+
+    python api/benchmark.py coldstart --runs 5
+
+encoders: load time, single-query latency and batch throughput of each query
+encoder backend, and the cosine agreement of its vectors with the reference
+backend (fp32 fastembed) on the same texts.
+
+    python api/benchmark.py encoders --backends fastembed onnx-int8 sentence-transformers --threads 1
+
+workers: starts serve.py with 1..N workers against the configured Qdrant and
+reports requests/sec and latency percentiles over real HTTP, plus the RSS and
+PSS (RSS with shared pages split between the processes sharing them) of the
+parent and the workers. Compare with --no-preload to see what per-worker
+model loading costs.
+
+    python api/benchmark.py workers --workers 1 2 4 --scenario text
+
+faults: text searches for --duration seconds against a fault-injecting
+stand-in (--error-rate of calls fail, --slow-rate of calls take --slow-ms, and
+every call fails during an outage window), once with the plain client and once
+through the resilience layer. Reports latency percentiles, error rate, stale
+responses served, and the retry/hedge/circuit breaker counters.
+
+    python api/benchmark.py faults --error-rate 0.05 --slow-rate 0.02 --slow-ms 2000 --hedge
+"""
+
+import argparse
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from cache import ResultCache
+from embedding import EmbeddingScheduler
+from encoders import ENCODER_BACKENDS, load_encoder
+from local_index import LocalIndex
+from main import Config, QdrantService
+from pagination import NEXT_CURSOR_HEADER
+
+logger = logging.getLogger(__name__)
+
+VECTOR_SIZE = 512
+PRODUCT_TYPES = ["Dress", "Trousers", "Sweater", "T-shirt", "Hoodie", "Jacket", "Shorts", "Skirt", "Top", "Socks"]
+COLOURS = ["Black", "White", "Dark Blue", "Grey", "Beige", "Red", "Light Pink", "Green"]
+QUERIES = ["black dress", "jeans", "hoodie", "summer top", "warm jacket", "kids pyjamas", "running shorts", "wool sweater"]
+
+
+class FakeEncoder:
+    """Deterministic stand-in for the CLIP text model so the benchmark measures I/O, not ONNX.
+
+    call_ms/item_ms simulate the fixed per-call and per-text cost of a forward pass.
+    """
+
+    def __init__(self, call_ms: float = 0.0, item_ms: float = 0.0):
+        self.call_ms = call_ms
+        self.item_ms = item_ms
+
+    def embed(self, texts):
+        texts = list(texts)
+        if self.call_ms or self.item_ms:
+            time.sleep((self.call_ms + self.item_ms * len(texts)) / 1000)
+        for text in texts:
+            seed = int.from_bytes(hashlib.md5(text.encode()).digest()[:4], "little")
+            yield np.random.default_rng(seed).standard_normal(VECTOR_SIZE).astype(np.float32)
+
+
+class BlockingClient:
+    """Pre-change behaviour: synchronous client calls made from inside async handlers."""
+
+    def __init__(self, client, latency):
+        self._client = client
+        self._latency = latency
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        async def call(*args, **kwargs):
+            time.sleep(self._latency)
+            return method(*args, **kwargs)
+
+        return call
+
+
+class NonBlockingClient:
+    """Post-change behaviour: the round trip yields to the event loop.
+
+    per_result_latency adds the cost of every result a query materializes,
+    including the ones skipped by `offset`.
+    """
+
+    def __init__(self, client, latency, per_result_latency=0.0):
+        self._client = client
+        self._latency = latency
+        self._per_result_latency = per_result_latency
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        async def call(*args, **kwargs):
+            materialized = kwargs.get("limit", 0)
+            if name == "query_points":
+                materialized += kwargs.get("offset") or 0
+            await asyncio.sleep(self._latency + self._per_result_latency * materialized)
+            result = method(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+        return call
+
+
+class FaultyClient(NonBlockingClient):
+    """Stand-in Qdrant with injected faults: random connection errors, slow tail calls and an
+    outage window (seconds after `start()`) during which every call fails."""
+
+    def __init__(self, client, latency, error_rate=0.0, slow_rate=0.0, slow_latency=0.0,
+                 outage_start=None, outage_seconds=0.0, seed=42):
+        super().__init__(client, latency)
+        self._error_rate = error_rate
+        self._slow_rate = slow_rate
+        self._slow_latency = slow_latency
+        self._outage = (outage_start, outage_start + outage_seconds) if outage_start is not None else None
+        self._rng = random.Random(seed)
+        self._started = time.monotonic()
+        self.injected = {"errors": 0, "slow": 0, "outage": 0}
+
+    def start(self):
+        self._started = time.monotonic()
+
+    def __getattr__(self, name):
+        call = super().__getattr__(name)
+        if name == "close":
+            return call
+
+        async def faulty(*args, **kwargs):
+            elapsed = time.monotonic() - self._started
+            if self._outage and self._outage[0] <= elapsed < self._outage[1]:
+                self.injected["outage"] += 1
+                await asyncio.sleep(self._latency)
+                raise httpx.ConnectError("injected outage")
+            roll = self._rng.random()
+            if roll < self._error_rate:
+                self.injected["errors"] += 1
+                await asyncio.sleep(self._latency)
+                raise httpx.ConnectError("injected error")
+            if roll < self._error_rate + self._slow_rate:
+                self.injected["slow"] += 1
+                await asyncio.sleep(self._slow_latency)
+            return await call(*args, **kwargs)
+
+        return faulty
+
+
+def synthetic_payload(i: int, rng: random.Random) -> dict:
+    product_type = rng.choice(PRODUCT_TYPES)
+    colour = rng.choice(COLOURS)
+    return {
+        "article_id": f"{i:010d}",
+        "prod_name": f"{colour} {product_type} {i}",
+        "detail_desc": f"A {colour.lower()} {product_type.lower()} from the synthetic catalog.",
+        "product_type_name": product_type,
+        "index_group_name": rng.choice(Config.GROUP_ORDER),
+        "colour_group_name": colour,
+        "image_url": f"https://example.com/images/{i:010d}.jpg",
+        "price": round(rng.uniform(5, 80), 2),
+    }
+
+
+def seed_collection(client: QdrantClient, points: int, batch_size: int = 1000):
+    """Create the collection with synthetic points (recreated if it already exists)."""
+    rng = random.Random(42)
+    vectors = np.random.default_rng(42).standard_normal((points, VECTOR_SIZE)).astype(np.float32)
+    if client.collection_exists(Config.COLLECTION_NAME):
+        client.delete_collection(Config.COLLECTION_NAME)
+    client.create_collection(
+        Config.COLLECTION_NAME,
+        vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE),
+    )
+    for start in range(0, points, batch_size):
+        end = min(start + batch_size, points)
+        client.upsert(
+            Config.COLLECTION_NAME,
+            points=[
+                models.PointStruct(id=i, vector=vectors[i].tolist(), payload=synthetic_payload(i, rng))
+                for i in range(start, end)
+            ],
+        )
+
+
+def percentile(sorted_values, p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def latency_summary(latencies, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def drive(concurrency: int, total: int) -> dict:
+    """Send `total` search requests with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    transport = httpx.ASGITransport(app=main.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def one(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await http.get("/api/py/search", params={"query": QUERIES[i % len(QUERIES)], "limit": 20})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return {"concurrency": concurrency, **latency_summary(latencies, elapsed)}
+
+
+async def run_search(args) -> dict:
+    if args.url:
+        sync_client = QdrantClient(url=args.url)
+        seed_collection(sync_client, args.points)
+        clients = {
+            "blocking": BlockingClient(sync_client, 0),
+            "async": AsyncQdrantClient(url=args.url, timeout=Config.QDRANT_TIMEOUT, pool_size=Config.QDRANT_POOL_SIZE),
+        }
+    else:
+        sync_client = QdrantClient(":memory:")
+        seed_collection(sync_client, args.points)
+        latency = args.latency_ms / 1000
+        clients = {
+            "blocking": BlockingClient(sync_client, latency),
+            "async": NonBlockingClient(sync_client, latency),
+        }
+
+    report = {}
+    for name, client in clients.items():
+        service = main.qdrant_service = QdrantService(client=client, encoder=FakeEncoder())
+        # The queries repeat, so without this the comparison would mostly time cache hits
+        service.result_cache = ResultCache(max_entries=0, ttl_seconds=0)
+        report[name] = await drive(args.concurrency, args.requests)
+    report["speedup"] = round(report["async"]["requests_per_sec"] / report["blocking"]["requests_per_sec"], 2)
+    return report
+
+
+async def run_pages(args) -> dict:
+    if args.url:
+        sync_client = QdrantClient(url=args.url)
+        client = AsyncQdrantClient(url=args.url, timeout=Config.QDRANT_TIMEOUT, pool_size=Config.QDRANT_POOL_SIZE)
+    else:
+        sync_client = QdrantClient(":memory:")
+        client = NonBlockingClient(sync_client, args.latency_ms / 1000, args.per_result_us / 1e6)
+    seed_collection(sync_client, args.points)
+    service = main.qdrant_service = QdrantService(client=client, encoder=FakeEncoder())
+    params = {"query": QUERIES[0], "limit": args.limit}
+    transport = httpx.ASGITransport(app=main.app)
+
+    async def timed(http, **extra) -> tuple:
+        started = time.perf_counter()
+        response = await http.get("/api/py/search", params={**params, **extra})
+        response.raise_for_status()
+        return (time.perf_counter() - started) * 1000, response.headers.get(NEXT_CURSOR_HEADER)
+
+    report = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        for depth in args.depths:
+            service.result_cache.clear()
+            service.search_windows.clear()
+            offset_ms, _ = await timed(http, offset=(depth - 1) * args.limit)
+
+            # Walk to the same page with cursors, starting from a cold cache
+            service.result_cache.clear()
+            service.search_windows.clear()
+            cursor, walk_ms = None, []
+            for _ in range(depth):
+                page_ms, cursor = await timed(http, **({"cursor": cursor} if cursor else {}))
+                walk_ms.append(page_ms)
+            report.append({
+                "page": depth,
+                "offset_ms": round(offset_ms, 2),
+                "cursor_ms": round(walk_ms[-1], 2),
+                "cursor_mean_page_ms": round(sum(walk_ms) / len(walk_ms), 2),
+            })
+    return {"limit": args.limit, "points": args.points, "pages": report}
+
+
+async def run_embed(args) -> dict:
+    if args.fake_encoder:
+        encoder = FakeEncoder(call_ms=args.call_ms, item_ms=args.item_ms)
+    else:
+        encoder = main.load_text_encoder()
+    # Distinct texts so batches can't collapse duplicates
+    texts = [f"{QUERIES[i % len(QUERIES)]} {i}" for i in range(args.requests)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def burst(embed_one) -> dict:
+        async def one(text):
+            async with semaphore:
+                await embed_one(text)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(text) for text in texts))
+        elapsed = time.perf_counter() - started
+        return {"seconds": round(elapsed, 3), "embeddings_per_sec": round(len(texts) / elapsed, 1)}
+
+    async def inline(text):
+        # Pre-change behaviour: one forward pass per request on the event loop thread
+        return list(encoder.embed([text]))[0]
+
+    scheduler = EmbeddingScheduler(encoder, window_ms=args.window_ms, max_batch_size=args.max_batch_size)
+    report = {"inline": await burst(inline), "scheduler": await burst(scheduler.embed)}
+    report["scheduler"]["metrics"] = scheduler.metrics()
+    report["speedup"] = round(report["scheduler"]["embeddings_per_sec"] / report["inline"]["embeddings_per_sec"], 2)
+    scheduler.close()
+    return report
+
+
+# Scenario name -> (path, params for request i)
+LOAD_SCENARIOS = {
+    "text": lambda i, args: ("/api/py/search", {"query": QUERIES[i % len(QUERIES)], "limit": 20}),
+    "filter": lambda i, args: ("/api/py/search", {
+        "group": Config.GROUP_ORDER[i % len(Config.GROUP_ORDER)],
+        "item": PRODUCT_TYPES[i % len(PRODUCT_TYPES)],
+        "limit": 20,
+    }),
+    "deep_offset": lambda i, args: ("/api/py/search", {
+        "query": QUERIES[i % len(QUERIES)], "limit": 20, "offset": args.deep_offset,
+    }),
+    "groups": lambda i, args: ("/api/py/groups", {}),
+    "featured": lambda i, args: ("/api/py/featured", {"limit_per_category": 4}),
+}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def drive_scenario(http, scenario, args) -> dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(i: int):
+        path, params = scenario(i, args)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await http.get(path, params=params)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    # Unmeasured warm-up: lazy indexes and snapshots are built on first use
+    for i in range(args.warmup):
+        await one(i)
+    latencies.clear()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    return latency_summary(latencies, time.perf_counter() - started)
+
+
+async def run_load(args) -> dict:
+    if args.url:
+        sync_client = QdrantClient(url=args.url, timeout=max(Config.QDRANT_TIMEOUT, 60))
+        client = AsyncQdrantClient(url=args.url, timeout=Config.QDRANT_TIMEOUT, pool_size=Config.QDRANT_POOL_SIZE)
+    else:
+        sync_client = QdrantClient(":memory:")
+        client = NonBlockingClient(sync_client, args.latency_ms / 1000, args.per_result_us / 1e6)
+
+    seeded = time.perf_counter()
+    if not args.skip_seed:
+        seed_collection(sync_client, args.points)
+    seed_seconds = time.perf_counter() - seeded
+
+    service = main.qdrant_service = QdrantService(client=client, encoder=FakeEncoder(args.call_ms, args.item_ms))
+    if not args.result_cache:
+        # Measure the search path itself, not repeated cache hits
+        service.result_cache = ResultCache(max_entries=0, ttl_seconds=0)
+    # The app's lifespan builds the featured snapshot at startup; do the same here
+    await service.refresh_featured()
+    await service.refresh_collection_version()
+    if args.local_index:
+        service.local_index = LocalIndex(args.local_index, max_points=args.points)
+        await service.refresh_local_index()
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "stand_in": args.url or f"memory (latency {args.latency_ms}ms, {args.per_result_us}us/result)",
+        "points": sync_client.count(Config.COLLECTION_NAME).count,
+        "seed_seconds": round(seed_seconds, 1),
+        "concurrency": args.concurrency,
+        "result_cache": args.result_cache,
+        "local_index": bool(args.local_index),
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            for name in args.scenarios:
+                report["scenarios"][name] = await drive_scenario(http, LOAD_SCENARIOS[name], args)
+                logger.warning(f"{name}: {report['scenarios'][name]}")
+    finally:
+        await service.close()
+        main.qdrant_service = None
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def measure_import(api_dir: str) -> float:
+    code = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=api_dir, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(api_dir: str, port: int, ready_timeout: float) -> dict:
+    """Seconds from spawning uvicorn to the first answer on / and to /ready returning 200."""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=api_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first_response = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as http:
+            while time.perf_counter() - started < ready_timeout:
+                try:
+                    if first_response is None:
+                        http.get("/").raise_for_status()
+                        first_response = time.perf_counter() - started
+                    if http.get("/ready").status_code == 200:
+                        ready = time.perf_counter() - started
+                        break
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"first_response_s": first_response, "ready_s": ready}
+
+
+def run_coldstart(args) -> dict:
+    api_dir = os.path.dirname(os.path.abspath(__file__))
+    imports = sorted(measure_import(api_dir) for _ in range(args.runs))
+    startups = [measure_startup(api_dir, args.port, args.ready_timeout) for _ in range(args.runs)]
+
+    def median(values):
+        values = sorted(v for v in values if v is not None)
+        return round(values[len(values) // 2], 3) if values else None
+
+    return {
+        "revision": git_revision(),
+        "runs": args.runs,
+        "import_s": median(imports),
+        "first_response_s": median(s["first_response_s"] for s in startups),
+        # None when /ready never succeeded within --ready-timeout (e.g. Qdrant unreachable)
+        "ready_s": median(s["ready_s"] for s in startups),
+    }
+
+
+def run_encoders(args) -> dict:
+    texts = [f"{QUERIES[i % len(QUERIES)]} {PRODUCT_TYPES[i % len(PRODUCT_TYPES)].lower()}" for i in range(args.texts)]
+    backends = [args.reference] + [backend for backend in args.backends if backend != args.reference]
+    reference = None
+    report = {"threads": args.threads, "texts": len(texts), "reference": args.reference, "backends": {}}
+
+    for backend in backends:
+        started = time.perf_counter()
+        encoder = load_encoder(backend, Config.TEXT_EMBEDDING_MODEL, Config.MODEL_CACHE_DIR, threads=args.threads)
+        list(encoder.embed(["warm up"]))
+        load_seconds = time.perf_counter() - started
+
+        single = []
+        for text in texts[:args.single]:
+            started = time.perf_counter()
+            list(encoder.embed([text]))
+            single.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        vectors = np.stack([
+            vector
+            for start in range(0, len(texts), args.batch_size)
+            for vector in encoder.embed(texts[start:start + args.batch_size])
+        ])
+        elapsed = time.perf_counter() - started
+
+        entry = {
+            "load_s": round(load_seconds, 2),
+            "single": latency_summary(single, sum(single)),
+            "batch_size": args.batch_size,
+            "texts_per_sec": round(len(texts) / elapsed, 1),
+        }
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        if reference is None:
+            reference = normalized
+        else:
+            cosine = np.sum(normalized * reference, axis=1)
+            entry["cosine_vs_reference"] = {"min": round(float(cosine.min()), 5), "mean": round(float(cosine.mean()), 5)}
+        report["backends"][backend] = entry
+        del encoder
+    return report
+
+
+def process_memory(pid: int) -> dict:
+    """RSS and PSS of a process in MB (Linux)."""
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                memory[name.lower() + "_mb"] = round(int(value.split()[0]) / 1024, 1)
+    return memory
+
+
+def child_pids(parent: int) -> list:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The ppid follows the parenthesised command name
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == parent:
+                    children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            pass
+    return children
+
+
+async def measure_workers(workers: int, args) -> dict:
+    api_dir = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, "serve.py", "--workers", str(workers), "--port", str(args.port), "--log-level", "warning"]
+    if args.no_preload:
+        command.append("--no-preload")
+    server = subprocess.Popen(command, cwd=api_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=None) as http:
+            # Every worker answers /ready on its own; wait for a run of successes
+            started, ready_streak = time.perf_counter(), 0
+            while ready_streak < 4 * workers:
+                if time.perf_counter() - started > args.ready_timeout:
+                    raise RuntimeError(f"serve.py with {workers} workers not ready after {args.ready_timeout}s")
+                try:
+                    ready_streak = ready_streak + 1 if (await http.get("/ready")).status_code == 200 else 0
+                except httpx.HTTPError:
+                    ready_streak = 0
+                await asyncio.sleep(0.05)
+            result = {"workers": workers, **(await drive_scenario(http, LOAD_SCENARIOS[args.scenario], args))}
+
+        memory = [process_memory(pid) for pid in child_pids(server.pid)]
+        result["parent"] = process_memory(server.pid)
+        result["worker_rss_mb"] = round(sum(m["rss_mb"] for m in memory) / len(memory), 1)
+        result["worker_pss_mb"] = round(sum(m["pss_mb"] for m in memory) / len(memory), 1)
+        result["total_pss_mb"] = round(result["parent"]["pss_mb"] + sum(m["pss_mb"] for m in memory), 1)
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def run_workers(args) -> dict:
+    report = {"revision": git_revision(), "scenario": args.scenario, "preload": not args.no_preload, "runs": []}
+    for workers in args.workers:
+        report["runs"].append(await measure_workers(workers, args))
+    base = report["runs"][0]["requests_per_sec"] / report["runs"][0]["workers"]
+    for run in report["runs"]:
+        run["scaling_efficiency"] = round(run["requests_per_sec"] / (base * run["workers"]), 2)
+    return report
+
+
+async def drive_for(http, duration: float, concurrency: int) -> dict:
+    """Text searches from `concurrency` loops for `duration` seconds; latencies and status counts."""
+    latencies, statuses = [], {}
+    deadline = time.monotonic() + duration
+
+    async def loop(worker: int):
+        i = worker
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = await http.get("/api/py/search", params={"query": QUERIES[i % len(QUERIES)], "limit": 20})
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            i += concurrency
+
+    started = time.perf_counter()
+    await asyncio.gather(*(loop(worker) for worker in range(concurrency)))
+    summary = latency_summary(latencies, time.perf_counter() - started)
+    summary["statuses"] = statuses
+    summary["error_rate"] = round(1 - statuses.get(200, 0) / len(latencies), 4)
+    return summary
+
+
+async def run_faults(args) -> dict:
+    sync_client = QdrantClient(":memory:")
+    seed_collection(sync_client, args.points)
+    report = {
+        "revision": git_revision(),
+        "faults": {
+            "error_rate": args.error_rate, "slow_rate": args.slow_rate, "slow_ms": args.slow_ms,
+            "outage": [args.outage_start, args.outage_start + args.outage_seconds] if args.outage_seconds else None,
+        },
+        "runs": {},
+    }
+    defaults = (Config.QDRANT_RESILIENCE_ENABLED, Config.QDRANT_HEDGE_ENABLED, Config.QDRANT_CALL_TIMEOUT)
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        for mode in ("plain", "resilient"):
+            Config.QDRANT_RESILIENCE_ENABLED = mode == "resilient"
+            Config.QDRANT_HEDGE_ENABLED = args.hedge
+            Config.QDRANT_CALL_TIMEOUT = args.call_timeout_ms / 1000
+            faulty = FaultyClient(
+                sync_client, args.latency_ms / 1000, args.error_rate, args.slow_rate, args.slow_ms / 1000,
+                args.outage_start if args.outage_seconds else None, args.outage_seconds
+            )
+            service = main.qdrant_service = QdrantService(client=faulty, encoder=FakeEncoder())
+            # Results expire quickly, so stale copies exist without serving fresh hits
+            service.result_cache = ResultCache(ttl_seconds=args.cache_ttl_ms / 1000)
+            await service.refresh_collection_version()
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+                # Clean warm-up: embeddings cached, latency history for hedging, a cached copy of every query
+                faulty._error_rate, faulty._slow_rate = 0.0, 0.0
+                for i in range(max(len(QUERIES), args.warmup)):
+                    await http.get("/api/py/search", params={"query": QUERIES[i % len(QUERIES)], "limit": 20})
+                faulty._error_rate, faulty._slow_rate = args.error_rate, args.slow_rate
+                faulty.start()
+                run = await drive_for(http, args.duration, args.concurrency)
+            run["injected"] = dict(faulty.injected)
+            run["stale_served"] = service.result_cache.metrics()["stale_hits"]
+            if isinstance(service.client, main.ResilientClient):
+                run["resilience"] = service.client.metrics()
+            report["runs"][mode] = run
+            logger.warning(f"{mode}: {run}")
+            # Both runs share the in-memory client, so only stop the encoder threads
+            service.embedder.close()
+    finally:
+        Config.QDRANT_RESILIENCE_ENABLED, Config.QDRANT_HEDGE_ENABLED, Config.QDRANT_CALL_TIMEOUT = defaults
+        main.qdrant_service = None
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser("search", help="Concurrent /api/py/search throughput, blocking vs async client")
+    search.add_argument("--url", help="Qdrant URL to benchmark against instead of the in-memory stand-in")
+    search.add_argument("--points", type=int, default=2000, help="Number of synthetic points to seed")
+    search.add_argument("--concurrency", type=int, default=32, help="Concurrent in-flight requests")
+    search.add_argument("--requests", type=int, default=512, help="Total requests per run")
+    search.add_argument("--latency-ms", type=float, default=20.0, help="Simulated Qdrant round trip for the in-memory stand-in")
+    search.set_defaults(run=run_search)
+
+    pages = subparsers.add_parser("pages", help="Latency of deep pages, integer offset vs cursor")
+    pages.add_argument("--url", help="Qdrant URL to benchmark against instead of the in-memory stand-in")
+    pages.add_argument("--points", type=int, default=5000, help="Number of synthetic points to seed")
+    pages.add_argument("--limit", type=int, default=20, help="Page size")
+    pages.add_argument("--depths", type=int, nargs="+", default=[1, 10, 50, 100], help="Page numbers to measure")
+    pages.add_argument("--latency-ms", type=float, default=5.0, help="Simulated Qdrant round trip for the in-memory stand-in")
+    pages.add_argument("--per-result-us", type=float, default=20.0, help="Simulated cost per materialized result")
+    pages.set_defaults(run=run_pages)
+
+    embed = subparsers.add_parser("embed", help="Embeddings/sec under a burst, inline vs micro-batched")
+    embed.add_argument("--concurrency", type=int, default=64, help="Concurrent in-flight queries")
+    embed.add_argument("--requests", type=int, default=1024, help="Total queries per run")
+    embed.add_argument("--window-ms", type=float, default=Config.EMBED_BATCH_WINDOW_MS, help="Batching window")
+    embed.add_argument("--max-batch-size", type=int, default=Config.EMBED_MAX_BATCH_SIZE, help="Maximum batch size")
+    embed.add_argument("--fake-encoder", action="store_true", help="Use a simulated encoder instead of the CLIP model")
+    embed.add_argument("--call-ms", type=float, default=4.0, help="Simulated fixed cost per encoder call")
+    embed.add_argument("--item-ms", type=float, default=0.5, help="Simulated cost per text in a call")
+    embed.set_defaults(run=run_embed)
+
+    load = subparsers.add_parser("load", help="Throughput and p50/p95/p99 per endpoint scenario, as JSON")
+    load.add_argument("--url", help="Qdrant URL to benchmark against instead of the in-memory stand-in")
+    load.add_argument("--points", type=int, default=10000, help="Synthetic catalog size, e.g. 10000, 100000 or 1000000")
+    load.add_argument("--skip-seed", action="store_true", help="Reuse the collection already at --url")
+    load.add_argument("--scenarios", nargs="+", choices=list(LOAD_SCENARIOS), default=list(LOAD_SCENARIOS),
+                      help="Scenarios to run")
+    load.add_argument("--concurrency", type=int, default=16, help="Concurrent in-flight requests")
+    load.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    load.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario")
+    load.add_argument("--deep-offset", type=int, default=1000, help="Offset for the deep_offset scenario")
+    load.add_argument("--result-cache", action="store_true", help="Keep the search result cache enabled")
+    load.add_argument("--latency-ms", type=float, default=2.0, help="Simulated Qdrant round trip for the in-memory stand-in")
+    load.add_argument("--per-result-us", type=float, default=0.0, help="Simulated cost per materialized result")
+    load.add_argument("--call-ms", type=float, default=4.0, help="Simulated fixed cost per encoder call")
+    load.add_argument("--item-ms", type=float, default=0.5, help="Simulated cost per text in a call")
+    load.add_argument("--local-index", help="Serve searches from a local index built in this directory")
+    load.add_argument("--output", help="Also write the JSON report to this file")
+    load.set_defaults(run=run_load)
+
+    coldstart = subparsers.add_parser("coldstart", help="Import time and time to first response / readiness")
+    coldstart.add_argument("--runs", type=int, default=3, help="Fresh processes to measure (median is reported)")
+    coldstart.add_argument("--port", type=int, default=8765, help="Port for the spawned server")
+    coldstart.add_argument("--ready-timeout", type=float, default=60.0, help="Give up waiting for /ready after this many seconds")
+    coldstart.set_defaults(run=run_coldstart)
+
+    encoders = subparsers.add_parser("encoders", help="Latency, throughput and cosine agreement per encoder backend")
+    encoders.add_argument("--backends", nargs="+", choices=ENCODER_BACKENDS, default=list(ENCODER_BACKENDS), help="Backends to measure")
+    encoders.add_argument("--reference", choices=ENCODER_BACKENDS, default="fastembed", help="Backend the others are compared against")
+    encoders.add_argument("--threads", type=int, default=None, help="Intra-op threads per backend (default: all cores)")
+    encoders.add_argument("--texts", type=int, default=512, help="Texts for the throughput and agreement runs")
+    encoders.add_argument("--single", type=int, default=100, help="Single-query calls for the latency percentiles")
+    encoders.add_argument("--batch-size", type=int, default=Config.EMBED_MAX_BATCH_SIZE, help="Texts per call in the throughput run")
+    encoders.set_defaults(run=run_encoders)
+
+    workers = subparsers.add_parser("workers", help="Throughput and memory of serve.py from 1 to N workers")
+    workers.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to measure")
+    workers.add_argument("--scenario", choices=list(LOAD_SCENARIOS), default="text", help="Request mix")
+    workers.add_argument("--no-preload", action="store_true", help="Let each worker load its own encoder")
+    workers.add_argument("--port", type=int, default=8766, help="Port for serve.py")
+    workers.add_argument("--concurrency", type=int, default=64, help="Concurrent in-flight requests")
+    workers.add_argument("--requests", type=int, default=2000, help="Measured requests per worker count")
+    workers.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per worker count")
+    workers.add_argument("--deep-offset", type=int, default=1000, help="Offset for the deep_offset scenario")
+    workers.add_argument("--ready-timeout", type=float, default=120.0, help="Seconds to wait for the workers")
+    workers.set_defaults(run=run_workers)
+
+    faults = subparsers.add_parser("faults", help="Latency and errors under injected Qdrant faults, plain vs resilient client")
+    faults.add_argument("--points", type=int, default=2000, help="Number of synthetic points to seed")
+    faults.add_argument("--duration", type=float, default=20.0, help="Seconds of load per run")
+    faults.add_argument("--concurrency", type=int, default=16, help="Concurrent in-flight requests")
+    faults.add_argument("--warmup", type=int, default=100, help="Fault-free requests before each run")
+    faults.add_argument("--latency-ms", type=float, default=5.0, help="Simulated Qdrant round trip")
+    faults.add_argument("--error-rate", type=float, default=0.05, help="Fraction of calls failing with a connection error")
+    faults.add_argument("--slow-rate", type=float, default=0.02, help="Fraction of calls taking --slow-ms")
+    faults.add_argument("--slow-ms", type=float, default=2000.0, help="Latency of a slow call")
+    faults.add_argument("--outage-start", type=float, default=8.0, help="Seconds into the run when the outage starts")
+    faults.add_argument("--outage-seconds", type=float, default=4.0, help="Outage length (0: no outage)")
+    faults.add_argument("--call-timeout-ms", type=float, default=250.0, help="Per-call timeout of the resilient client")
+    faults.add_argument("--cache-ttl-ms", type=float, default=0.0, help="Result cache TTL (expired entries serve stale)")
+    faults.add_argument("--hedge", action="store_true", help="Send hedged duplicate reads after the p95")
+    faults.set_defaults(run=run_faults)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, force=True)
+    args = parse_args()
+    result = args.run(args)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,100 @@
+"""
+Response caching for the search API.
+
+ResultCache is an LRU cache of computed responses with a TTL, keyed on the
+canonicalized request plus the collection version it was computed against.
+Expired entries stay until evicted, so they can still be served stale while
+Qdrant is unavailable.
+SingleFlight makes concurrent callers with the same key share one in-flight
+computation instead of each running their own.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Tuple
+
+
+def canonical_filter(values: Iterable[str]) -> Tuple[str, ...]:
+    """Order-independent, de-duplicated form of a filter value list."""
+    return tuple(sorted(set(values)))
+
+
+class ResultCache:
+    """LRU cache of responses bounded by entry count and TTL."""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+
+    def get(self, key: Hashable, stale: bool = False) -> Any:
+        """Cached value, or None if missing or expired (expired values too when `stale`)."""
+        entry = self._entries.get(key)
+        if entry is None or (entry[1] < time.monotonic() and not stale):
+            if not stale:
+                self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_hits": self.stale_hits,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+        }
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one computation."""
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # Shield so one waiter being cancelled doesn't cancel the shared computation
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fn())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    def metrics(self) -> dict:
+        return {"in_flight": len(self._in_flight), "coalesced": self.coalesced}
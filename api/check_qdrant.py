@@ -2,11 +2,24 @@
 """
 Script to check if the Qdrant Cloud connection is working properly.
 Run this script to verify your Qdrant Cloud credentials.
+
+It also tunes the collection:
+
+    python api/check_qdrant.py                       # connection check
+    python api/check_qdrant.py indexes [--create]    # inspect/create payload indexes for filter fields
+    python api/check_qdrant.py profiles              # list HNSW/quantization profiles
+    python api/check_qdrant.py apply int8            # apply a profile to the collection
+    python api/check_qdrant.py compare --recall-target 0.95
+                                                     # recall@k and p50/p99 latency per profile
 """
 
+import argparse
+import json
 import os
+import random
+import time
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, models
 import logging
 
 # Set up logging
@@ -21,6 +34,28 @@ QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 COLLECTION_NAME = os.getenv("QDRANT_COLLECTION")
 
+# Payload fields the API filters or looks up on; each needs a keyword index
+FILTER_FIELDS = ["index_group_name", "product_type_name", "colour_group_name", "article_id"]
+
+VECTOR_SIZE = 512
+# Name of the unnamed dense vector; collections built by ingest.py also hold a named sparse vector
+DENSE_VECTOR = ""
+
+# Collection profiles, from the plain HNSW baseline to cheaper quantized/on-disk variants
+PROFILES = {
+    "baseline": {"m": 16, "ef_construct": 100, "int8": False, "on_disk": False, "hnsw_ef": 128},
+    "high-recall": {"m": 32, "ef_construct": 256, "int8": False, "on_disk": False, "hnsw_ef": 256},
+    "int8": {"m": 16, "ef_construct": 100, "int8": True, "on_disk": False, "hnsw_ef": 128},
+    "int8-on-disk": {"m": 16, "ef_construct": 100, "int8": True, "on_disk": True, "hnsw_ef": 128},
+    "int8-lean-hnsw": {"m": 8, "ef_construct": 64, "int8": True, "on_disk": True, "hnsw_ef": 96},
+}
+
+def get_client() -> QdrantClient:
+    return QdrantClient(
+        url=QDRANT_URL,
+        api_key=QDRANT_API_KEY
+    )
+
 def check_qdrant_connection():
     """Check if the Qdrant Cloud connection is working properly."""
     logger.info(f"Checking Qdrant connection to {QDRANT_URL}")
@@ -66,12 +101,224 @@ def check_qdrant_connection():
         logger.error(f"❌ Error connecting to Qdrant: {str(e)}")
         return False
 
+def check_payload_indexes(client: QdrantClient, collection_name: str, create: bool = False) -> dict:
+    """Report which filter fields have a keyword payload index, creating missing ones if asked."""
+    schema = client.get_collection(collection_name).payload_schema or {}
+    report = {}
+    for field in FILTER_FIELDS:
+        index = schema.get(field)
+        if index is not None:
+            report[field] = f"indexed ({index.data_type})"
+            logger.info(f"✅ {field}: {report[field]}")
+        elif create:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field,
+                field_schema=models.PayloadSchemaType.KEYWORD,
+                wait=True
+            )
+            report[field] = "created (keyword)"
+            logger.info(f"✅ {field}: {report[field]}")
+        else:
+            report[field] = "missing"
+            logger.warning(f"❌ {field}: no payload index (run with --create)")
+    return report
+
+def estimated_ram_per_point(profile: dict) -> int:
+    """Rough resident bytes per point: original vectors (unless on disk), int8 copy and HNSW links."""
+    vectors = 0 if profile["on_disk"] else VECTOR_SIZE * 4
+    quantized = VECTOR_SIZE if profile["int8"] else 0
+    links = profile["m"] * 2 * 4
+    return vectors + quantized + links
+
+# Rescoring oversampling for int8 profiles
+OVERSAMPLING = 2.0
+
+def search_params(profile: dict) -> models.SearchParams:
+    """What compare measures with; the API sends the same once api_env(profile) is set."""
+    return models.SearchParams(
+        hnsw_ef=profile["hnsw_ef"],
+        quantization=models.QuantizationSearchParams(rescore=True, oversampling=OVERSAMPLING) if profile["int8"] else None
+    )
+
+def api_env(profile: dict) -> dict:
+    """API environment variables that make its searches use the profile's search params.
+    Search params are per request, so applying a profile to the collection doesn't set them."""
+    env = {"SEARCH_HNSW_EF": str(profile["hnsw_ef"])}
+    if profile["int8"]:
+        env["SEARCH_OVERSAMPLING"] = str(OVERSAMPLING)
+    return env
+
+def apply_profile(client: QdrantClient, collection_name: str, name: str):
+    """Update the collection's HNSW, quantization and on-disk settings to match a profile."""
+    profile = PROFILES[name]
+    client.update_collection(
+        collection_name=collection_name,
+        hnsw_config=models.HnswConfigDiff(m=profile["m"], ef_construct=profile["ef_construct"]),
+        vectors_config={"": models.VectorParamsDiff(on_disk=profile["on_disk"])},
+        quantization_config=models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        ) if profile["int8"] else models.Disabled.DISABLED
+    )
+    logger.info(f"Applied profile '{name}' to {collection_name}: {profile}")
+    env = " ".join(f"{key}={value}" for key, value in api_env(profile).items())
+    logger.info(f"Set {env} for the API, so it searches with the profile's hnsw_ef/oversampling")
+
+def copy_collection(client: QdrantClient, source: str, target: str, name: str, batch_size: int = 256):
+    """Create `target` with a profile's settings and copy every point of `source` into it,
+    sparse vectors included, so hybrid collections keep working."""
+    profile = PROFILES[name]
+    sparse_vectors = client.get_collection(source).config.params.sparse_vectors
+    if client.collection_exists(target):
+        client.delete_collection(target)
+    client.create_collection(
+        target,
+        vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE, on_disk=profile["on_disk"]),
+        sparse_vectors_config=sparse_vectors,
+        hnsw_config=models.HnswConfigDiff(m=profile["m"], ef_construct=profile["ef_construct"]),
+        quantization_config=models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        ) if profile["int8"] else None
+    )
+    for field in FILTER_FIELDS:
+        client.create_payload_index(target, field_name=field, field_schema=models.PayloadSchemaType.KEYWORD)
+    offset = None
+    while True:
+        points, offset = client.scroll(source, limit=batch_size, offset=offset, with_payload=True, with_vectors=True)
+        if points:
+            client.upsert(target, points=[
+                models.PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points
+            ])
+        if offset is None:
+            break
+
+def dense_vector(vector):
+    """The dense vector of a point, whether it came back alone or keyed by name."""
+    return vector[DENSE_VECTOR] if isinstance(vector, dict) else vector
+
+def wait_until_indexed(client: QdrantClient, collection_name: str, timeout: float = 600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = client.get_collection(collection_name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+    logger.warning(f"{collection_name} still optimizing after {timeout}s; results may understate recall")
+
+def sample_queries(client: QdrantClient, collection_name: str, count: int, filtered: bool, seed: int = 7) -> list:
+    """Query vectors (and optional group filters) taken from random stored points."""
+    points, _ = client.scroll(
+        collection_name, limit=max(count * 5, 100), with_payload=["index_group_name"], with_vectors=[DENSE_VECTOR]
+    )
+    rng = random.Random(seed)
+    sample = rng.sample(points, min(count, len(points)))
+    return [
+        (
+            dense_vector(point.vector),
+            models.Filter(must=[models.FieldCondition(
+                key="index_group_name", match=models.MatchValue(value=point.payload["index_group_name"])
+            )]) if filtered and point.payload.get("index_group_name") else None
+        )
+        for point in sample
+    ]
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def compare_profiles(client: QdrantClient, collection_name: str, names: list, queries: int, k: int,
+                     recall_target: float, filtered: bool, keep: bool) -> dict:
+    """Build a shadow collection per profile and measure recall@k against exact search, plus latency."""
+    sample = sample_queries(client, collection_name, queries, filtered)
+    truth = [
+        {hit.id for hit in client.query_points(
+            collection_name, query=vector, query_filter=query_filter, limit=k,
+            search_params=models.SearchParams(exact=True)
+        ).points}
+        for vector, query_filter in sample
+    ]
+
+    report = {}
+    for name in names:
+        shadow = f"{collection_name}__{name}"
+        logger.info(f"Building shadow collection {shadow}")
+        copy_collection(client, collection_name, shadow, name)
+        wait_until_indexed(client, shadow)
+
+        recalls, latencies = [], []
+        for (vector, query_filter), expected in zip(sample, truth):
+            started = time.perf_counter()
+            hits = client.query_points(
+                shadow, query=vector, query_filter=query_filter, limit=k, search_params=search_params(PROFILES[name])
+            ).points
+            latencies.append((time.perf_counter() - started) * 1000)
+            recalls.append(len({hit.id for hit in hits} & expected) / max(len(expected), 1))
+
+        report[name] = {
+            "recall_at_k": round(sum(recalls) / len(recalls), 4),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "estimated_ram_bytes_per_point": estimated_ram_per_point(PROFILES[name]),
+            "api_env": api_env(PROFILES[name]),
+        }
+        logger.info(f"{name}: {report[name]}")
+        if not keep:
+            client.delete_collection(shadow)
+
+    eligible = [name for name in names if report[name]["recall_at_k"] >= recall_target]
+    recommended = min(
+        eligible,
+        key=lambda name: (report[name]["estimated_ram_bytes_per_point"], report[name]["p99_ms"])
+    ) if eligible else None
+    return {"k": k, "queries": len(sample), "recall_target": recall_target, "profiles": report, "recommended": recommended}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command")
+
+    indexes = subparsers.add_parser("indexes", help="Inspect payload indexes for the filter fields")
+    indexes.add_argument("--create", action="store_true", help="Create missing keyword indexes")
+
+    subparsers.add_parser("profiles", help="List the available profiles")
+
+    apply = subparsers.add_parser("apply", help="Apply a profile to the collection")
+    apply.add_argument("profile", choices=list(PROFILES))
+
+    compare = subparsers.add_parser("compare", help="Compare recall@k and latency between profiles")
+    compare.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES))
+    compare.add_argument("--queries", type=int, default=200, help="Number of sample queries")
+    compare.add_argument("-k", type=int, default=20, help="Results per query for recall@k")
+    compare.add_argument("--recall-target", type=float, default=0.95, help="Minimum acceptable recall@k")
+    compare.add_argument("--filtered", action="store_true", help="Filter each query by a group, like the API does")
+    compare.add_argument("--keep", action="store_true", help="Keep the shadow collections afterwards")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    if not QDRANT_URL or not QDRANT_API_KEY or not COLLECTION_NAME:
+    args = parse_args()
+    if args.command == "profiles":
+        print(json.dumps(
+            {name: {**profile, "estimated_ram_bytes_per_point": estimated_ram_per_point(profile), "api_env": api_env(profile)}
+             for name, profile in PROFILES.items()},
+            indent=2
+        ))
+        exit(0)
+
+    # An API key is only needed for Qdrant Cloud; tuning commands also work against a local Qdrant
+    if not QDRANT_URL or not COLLECTION_NAME or (args.command is None and not QDRANT_API_KEY):
         logger.error("Missing Qdrant configuration in environment variables!")
         logger.error(f"QDRANT_URL: {'✅ Set' if QDRANT_URL else '❌ Missing'}")
         logger.error(f"QDRANT_API_KEY: {'✅ Set' if QDRANT_API_KEY else '❌ Missing'}")
         logger.error(f"QDRANT_COLLECTION: {'✅ Set' if COLLECTION_NAME else '❌ Missing'}")
         exit(1)
-        
-    check_qdrant_connection() 
\ No newline at end of file
+
+    if args.command is None:
+        check_qdrant_connection()
+    elif args.command == "indexes":
+        print(json.dumps(check_payload_indexes(get_client(), COLLECTION_NAME, create=args.create), indent=2))
+    elif args.command == "apply":
+        apply_profile(get_client(), COLLECTION_NAME, args.profile)
+    elif args.command == "compare":
+        print(json.dumps(compare_profiles(
+            get_client(), COLLECTION_NAME, args.profiles, args.queries, args.k,
+            args.recall_target, args.filtered, args.keep
+        ), indent=2))
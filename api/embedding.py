@@ -0,0 +1,182 @@
+"""
+Query embedding helpers for the search API.
+
+EmbeddingScheduler collects the queries that arrive within a short window (or
+until a maximum batch size is reached) and encodes them with a single batched
+TextEmbedding.embed call in a worker thread, so CPU-bound encoding never runs
+on the event loop and concurrent requests share one forward pass.
+
+EmbeddingCache keeps recently used query vectors as float32 arrays (or sparse
+embeddings with indices/values arrays), keyed on the normalized query text, so
+repeated searches skip the encoder entirely.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from urllib.parse import unquote
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingScheduler:
+    def __init__(self, encoder, window_ms: float = 5.0, max_batch_size: int = 32, workers: int = 1):
+        self.encoder = encoder
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed")
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer = None
+        self._batches_in_flight = 0
+        self._batches = 0
+        self._embedded = 0
+        self._largest_batch = 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Queue a query for the next batch and wait for its vector."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Identical queries in the same window are encoded once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self._batches_in_flight += 1
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(self._executor, self._encode, texts)
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._batches_in_flight -= 1
+
+        self._batches += 1
+        self._embedded += len(texts)
+        self._largest_batch = max(self._largest_batch, len(texts))
+        by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            # The caller may have gone away (client disconnect / timeout)
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def _encode(self, texts: List[str]) -> List[np.ndarray]:
+        return list(self.encoder.embed(texts))
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": len(self._pending),
+            "batches_in_flight": self._batches_in_flight,
+            "batches": self._batches,
+            "embedded": self._embedded,
+            "largest_batch": self._largest_batch,
+            "mean_batch_size": round(self._embedded / self._batches, 2) if self._batches else 0.0,
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: URL-unquoted, whitespace-collapsed and case-folded."""
+    return " ".join(unquote(text.strip()).split()).casefold()
+
+
+class EmbeddingCache:
+    """LRU cache of query vectors bounded by entry count, total bytes and TTL."""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        vector, expires_at = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return vector
+
+    def put(self, key: str, vector) -> np.ndarray:
+        # Cached vectors are shared between requests, so make sure nobody mutates them
+        if hasattr(vector, "indices"):
+            vector.indices.setflags(write=False)
+            vector.values.setflags(write=False)
+        else:
+            vector = np.asarray(vector, dtype=np.float32)
+            vector.setflags(write=False)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (vector, time.monotonic() + self.ttl)
+        self._bytes += self._entry_size(key, vector)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return vector
+
+    def _remove(self, key: str):
+        vector, _ = self._entries.pop(key)
+        self._bytes -= self._entry_size(key, vector)
+
+    @staticmethod
+    def _entry_size(key: str, vector: np.ndarray) -> int:
+        if hasattr(vector, "indices"):
+            return vector.indices.nbytes + vector.values.nbytes + len(key.encode())
+        return vector.nbytes + len(key.encode())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+        }
@@ -0,0 +1,112 @@
+"""
+Query encoder backends for the search API.
+
+Every backend exposes the fastembed-style `embed(texts)` returning one float32
+vector per text, which is what EmbeddingScheduler calls. The backend is picked
+with ENCODER_BACKEND:
+
+- fastembed: the CLIP text model on fastembed's ONNX runtime (default);
+- onnx-int8: the same model with int8 dynamically quantized weights, exported
+  once next to the downloaded model in the model cache directory (the export
+  needs the onnx package; without it the fp32 model is loaded instead);
+- sentence-transformers: the PyTorch clip-ViT-B-32 model the root main.py
+  uses. torch is only imported when this backend is selected.
+
+Hybrid search adds a sparse keyword encoder (load_sparse_encoder), a fastembed
+SparseTextEmbedding model such as Qdrant/bm25, behind the same interface.
+
+`threads` caps the intra-op threads of the ONNX session (or torch), so
+EMBED_WORKERS x threads can be sized to the machine instead of every session
+grabbing all cores.
+"""
+
+import logging
+import os
+import shutil
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ENCODER_BACKENDS = ("fastembed", "onnx-int8", "sentence-transformers")
+# sentence-transformers name of the CLIP model behind Qdrant/clip-ViT-B-32-text
+SENTENCE_TRANSFORMERS_MODEL = "clip-ViT-B-32"
+
+
+class SentenceTransformerEncoder:
+    def __init__(self, model_name: str, cache_dir: str, threads: Optional[int]):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, cache_folder=cache_dir, device="cpu")
+
+    def embed(self, texts: Iterable[str]) -> List[np.ndarray]:
+        vectors = self.model.encode(list(texts), convert_to_numpy=True)
+        return list(vectors.astype(np.float32))
+
+
+class SparseQueryEncoder:
+    """Sparse model encoding queries with its query-side weighting (BM25 weighs each query
+    term once; Qdrant applies the IDF)."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def embed(self, texts: Iterable[str]):
+        return list(self.model.query_embed(list(texts)))
+
+
+def quantized_model_dir(model_name: str, cache_dir: str) -> str:
+    """Directory holding an int8 copy of a fastembed model, exported on first use."""
+    from fastembed import TextEmbedding
+
+    target = os.path.join(cache_dir, model_name.replace("/", "--") + "-int8")
+    if os.path.exists(os.path.join(target, "model.onnx")):
+        return target
+
+    # onnx is only needed for the one-off export
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    source = TextEmbedding(model_name=model_name, cache_dir=cache_dir, lazy_load=True).model._model_dir
+    logger.info(f"Exporting int8 quantized {model_name} to {target}")
+    partial = target + ".partial"
+    shutil.rmtree(partial, ignore_errors=True)
+    # Tokenizer and config files are shared with the fp32 model
+    shutil.copytree(source, partial, ignore=shutil.ignore_patterns("*.onnx", "*.onnx_data"))
+    quantize_dynamic(
+        os.path.join(source, "model.onnx"),
+        os.path.join(partial, "model.onnx"),
+        weight_type=QuantType.QInt8,
+    )
+    os.replace(partial, target)
+    return target
+
+
+def load_encoder(backend: str, model_name: str, cache_dir: str, threads: Optional[int] = None,
+                 cpu_mem_arena: bool = True):
+    """Build the query encoder for `backend`."""
+    if backend == "sentence-transformers":
+        return SentenceTransformerEncoder(SENTENCE_TRANSFORMERS_MODEL, cache_dir, threads)
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}, expected one of {', '.join(ENCODER_BACKENDS)}")
+
+    from fastembed import TextEmbedding
+
+    # fastembed applies `threads` to both intra- and inter-op parallelism of the ONNX session
+    options = {"threads": threads, "enable_cpu_mem_arena": cpu_mem_arena}
+    if backend == "onnx-int8":
+        try:
+            options["specific_model_path"] = quantized_model_dir(model_name, cache_dir)
+        except ImportError as e:
+            # The export needs the onnx package; serving the fp32 model beats failing at startup
+            logger.warning(f"Can't export the int8 model ({str(e)}), falling back to the fastembed backend")
+    return TextEmbedding(model_name=model_name, cache_dir=cache_dir, **options)
+
+
+def load_sparse_encoder(model_name: str, cache_dir: str, threads: Optional[int] = None) -> SparseQueryEncoder:
+    """Build the sparse query encoder for hybrid search."""
+    from fastembed import SparseTextEmbedding
+
+    return SparseQueryEncoder(SparseTextEmbedding(model_name=model_name, cache_dir=cache_dir, threads=threads))
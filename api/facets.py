@@ -0,0 +1,113 @@
+"""
+In-memory facet index for the catalog's categorical payload fields.
+
+The index is built with a single streaming scroll over the collection (cursor
+offsets, facet fields only) and stores how many points share each combination
+of facet values. The number of distinct combinations is tiny compared to the
+catalog, so distinct values and filter-restricted counts are answered from
+memory without touching Qdrant.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FACET_FIELDS = ["index_group_name", "product_type_name", "colour_group_name"]
+
+
+class FacetIndex:
+    def __init__(self, fields: List[str] = FACET_FIELDS):
+        self.fields = list(fields)
+        self._combinations: Optional[Counter] = None
+        self._lock = asyncio.Lock()
+        self.points = 0
+        self.built_at = None
+        self.build_seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return self._combinations is not None
+
+    async def refresh(self, client, collection_name: str):
+        """Rebuild the index and swap it in atomically."""
+        async with self._lock:
+            await self._build(client, collection_name)
+
+    async def ensure_ready(self, client, collection_name: str):
+        """Build the index unless it is already built (or being built by another request)."""
+        if not self.ready:
+            async with self._lock:
+                if not self.ready:
+                    await self._build(client, collection_name)
+
+    async def _build(self, client, collection_name: str, page_size: int = 1000):
+        started = time.perf_counter()
+        combinations = Counter()
+        offset = None
+        while True:
+            points, offset = await client.scroll(
+                collection_name=collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=self.fields,
+                with_vectors=False
+            )
+            for point in points:
+                combinations[tuple(point.payload.get(field) for field in self.fields)] += 1
+            if offset is None:
+                break
+
+        self._combinations = combinations
+        self.points = sum(combinations.values())
+        self.built_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+        logger.info(
+            f"Built facet index: {self.points} points, {len(combinations)} combinations "
+            f"in {self.build_seconds:.2f}s"
+        )
+
+    async def refresh_periodically(self, client, collection_name: str, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(client, collection_name)
+            except Exception as e:
+                logger.warning(f"Failed to refresh facet index: {str(e)}")
+
+    def values(self, field: str) -> List[str]:
+        """Distinct non-empty values of a field."""
+        position = self.fields.index(field)
+        return list({combo[position] for combo in self._combinations if combo[position]})
+
+    def counts(self, filters: Dict[str, List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """Per-value counts for every facet field, most frequent first.
+
+        Counts for a field are restricted by the filters on the *other* fields, so
+        selecting a group still shows the counts of the sibling groups.
+        """
+        filters = {field: set(values) for field, values in (filters or {}).items() if values}
+        positions = {field: self.fields.index(field) for field in filters}
+        result = {}
+        for position, field in enumerate(self.fields):
+            counter = Counter()
+            for combo, count in self._combinations.items():
+                if not combo[position]:
+                    continue
+                if all(combo[positions[other]] in allowed
+                       for other, allowed in filters.items() if other != field):
+                    counter[combo[position]] += count
+            result[field] = dict(counter.most_common())
+        return result
+
+    def metrics(self) -> dict:
+        return {
+            "ready": self.ready,
+            "points": self.points,
+            "combinations": len(self._combinations) if self.ready else 0,
+            "built_at": self.built_at,
+            "build_seconds": round(self.build_seconds, 3) if self.build_seconds is not None else None,
+        }
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Featured products snapshot for the landing page.
+
+The snapshot holds a few products per group as plain JSON-ready dicts, in the
+same {group: [product, ...]} shape as featured-products.json and
+app/data/featuredProducts.json. It is refreshed in the background and served
+from memory, and can be exported so the frontend ships it statically:
+
+    python api/featured.py --output app/data/featuredProducts.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FeaturedSnapshot:
+    def __init__(self, limit_per_category: int = 4):
+        self.limit_per_category = limit_per_category
+        self.products: Optional[Dict[str, List[dict]]] = None
+        # Content hash, so HTTP ETags change when a refresh changes the snapshot
+        self.digest: Optional[str] = None
+        self.built_at = None
+
+    def get(self, limit_per_category: int) -> Optional[Dict[str, List[dict]]]:
+        """Snapshot trimmed to the requested size, or None if it can't serve it."""
+        if self.products is None or limit_per_category > self.limit_per_category:
+            return None
+        return {group: items[:limit_per_category] for group, items in self.products.items()}
+
+    def set(self, products: Dict[str, List[dict]]):
+        self.products = products
+        self.digest = hashlib.blake2b(json.dumps(products, sort_keys=True).encode(), digest_size=6).hexdigest()
+        self.built_at = time.time()
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        with open(path) as f:
+            self.set(json.load(f))
+        logger.info(f"Loaded featured products snapshot from {path}")
+        return True
+
+    def export(self, path: str, indent: Optional[int] = 2):
+        with open(path, "w") as f:
+            json.dump(self.products, f, indent=indent)
+        logger.info(f"Exported featured products snapshot to {path}")
+
+    async def refresh_periodically(self, build: Callable[[], Awaitable[None]], interval: float, immediately: bool = True):
+        if not immediately:
+            await asyncio.sleep(interval)
+        while True:
+            try:
+                await build()
+            except Exception as e:
+                logger.warning(f"Failed to refresh featured products snapshot: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def metrics(self) -> dict:
+        return {
+            "ready": self.products is not None,
+            "groups": len(self.products) if self.products else 0,
+            "limit_per_category": self.limit_per_category,
+            "built_at": self.built_at,
+        }
+
+
+async def export_snapshot(output: str, indent: Optional[int]):
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from main import QdrantService
+
+    service = QdrantService()
+    try:
+        await service.refresh_featured()
+        service.featured.export(output, indent=indent)
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="app/data/featuredProducts.json", help="Where to write the snapshot")
+    parser.add_argument("--compact", action="store_true", help="Write compact JSON, like featured-products.json")
+    args = parser.parse_args()
+    asyncio.run(export_snapshot(args.output, None if args.compact else 2))
@@ -0,0 +1,82 @@
+"""
+Background health probes for / and /api/py/diagnostic.
+
+The load balancer polls the health endpoints far more often than anything
+changes, so they must not open connections or call Qdrant themselves. A
+background task runs the checks instead: a Qdrant round trip on the service's
+pooled client (which also reads the collection stats) and an encoder pass
+for each loaded query encoder. The endpoints return the result of the last
+probe, together with rolling latency percentiles of every check.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Optional
+
+from resilience import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# A check returns details to report (or None) and raises when unhealthy
+Check = Callable[[], Awaitable[Optional[dict]]]
+
+
+class HealthProber:
+    def __init__(self, window: int = 120):
+        self.latency: Dict[str, LatencyWindow] = defaultdict(lambda: LatencyWindow(window))
+        self.results: Dict[str, dict] = {}
+        self.probes = 0
+        self.checked_at = None
+
+    async def probe(self, checks: Dict[str, Check]):
+        """Run every check concurrently and keep their results."""
+        outcomes = await asyncio.gather(*(self._run(name, check) for name, check in checks.items()))
+        self.results = {**self.results, **dict(zip(checks, outcomes))}
+        self.probes += 1
+        self.checked_at = time.time()
+
+    async def _run(self, name: str, check: Check) -> dict:
+        started = time.perf_counter()
+        try:
+            details = await check()
+        except Exception as e:
+            if self.results.get(name, {}).get("status") != "error":
+                logger.warning(f"Health check {name} failed: {str(e)}")
+            return {"status": "error", "error": str(e) or type(e).__name__, "checked_at": time.time()}
+        seconds = time.perf_counter() - started
+        self.latency[name].observe(seconds)
+        return {"status": "ok", "latency_ms": round(seconds * 1000, 2), "checked_at": time.time(), **(details or {})}
+
+    async def probe_periodically(self, checks: Callable[[], Dict[str, Check]], interval: float):
+        """Probe every `interval` seconds; `checks` is re-read each time as encoders load."""
+        while True:
+            try:
+                await self.probe(checks())
+            except Exception as e:
+                logger.warning(f"Health probe failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def ok(self, name: str) -> Optional[bool]:
+        """Whether the last `name` check passed, or None before the first one."""
+        result = self.results.get(name)
+        return None if result is None else result["status"] == "ok"
+
+    def percentiles(self) -> Dict[str, dict]:
+        """Rolling p50/p95/p99 latency (ms) of each check over its recent successful probes."""
+        return {
+            name: {
+                f"p{int(q * 100)}": round(window.percentile(q) * 1000, 2)
+                for q in (0.5, 0.95, 0.99)
+            }
+            for name, window in self.latency.items() if window.samples
+        }
+
+    def metrics(self) -> dict:
+        return {
+            "probes": self.probes,
+            "checked_at": self.checked_at,
+            "checks": self.results,
+            "latency_ms": self.percentiles(),
+        }
@@ -0,0 +1,74 @@
+"""
+HTTP caching for catalog-level responses.
+
+Groups, facets, featured products and filter-only search pages only change
+when the collection does. Their responses carry a strong ETag derived from the
+collection version (points count plus the ingest stamp) and the request URL,
+plus a CDN-friendly Cache-Control with stale-while-revalidate. A request whose
+If-None-Match matches gets a 304 before any handler runs. Large bodies are
+gzipped here rather than by a generic middleware: the gzipped representation
+needs its own strong ETag.
+"""
+
+import gzip
+import hashlib
+from typing import Mapping, Optional
+
+GZIP_ETAG_SUFFIX = "-gzip"
+# Paths whose responses are a pure function of the collection version and the query string
+CATALOG_PATHS = {
+    "/groups", "/api/py/groups",
+    "/facets", "/api/py/facets",
+    "/featured", "/api/py/featured",
+}
+SEARCH_PATHS = {"/search", "/api/py/search"}
+
+
+def is_cacheable(method: str, path: str, query_params: Mapping[str, str]) -> bool:
+    """Catalog endpoints and filter-only searches (text searches depend on the encoder too)."""
+    if method != "GET":
+        return False
+    if path in CATALOG_PATHS:
+        return True
+    return path in SEARCH_PATHS and not query_params.get("query", "").strip()
+
+
+def make_etag(version: str, path: str, query: str) -> str:
+    digest = hashlib.blake2b(f"{path}?{query}".encode(), digest_size=8).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def match_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """The tag from If-None-Match matching `etag` (either encoding), or None."""
+    if not if_none_match:
+        return None
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return etag
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        plain = tag[2:] if tag.startswith("W/") else tag
+        if plain == etag or plain == etag[:-1] + GZIP_ETAG_SUFFIX + '"':
+            return tag
+    return None
+
+
+def cache_control(max_age: int, stale_while_revalidate: int) -> str:
+    return f"public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}"
+
+
+def gzip_etag(etag: str) -> str:
+    return etag[:-1] + GZIP_ETAG_SUFFIX + '"'
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def compress(body: bytes, level: int = 6) -> bytes:
+    # mtime=0 keeps the output, and so the ETag's representation, byte-identical across workers
+    return gzip.compress(body, compresslevel=level, mtime=0)
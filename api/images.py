@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Thumbnail cache for product images, served by /img/{article_id}.
+
+Search hits point at full-size catalog images (image_url). This offline job
+fetches those images in parallel (or reads local originals) and encodes
+WebP thumbnails at a few widths in a process pool. It writes them to a
+content-addressed cache directory:
+
+- <digest[:2]>/<digest>.webp: one file per distinct thumbnail, named by the
+  hash of its bytes, so unchanged images are never rewritten and a new
+  version never overwrites a file a client may have cached;
+- image-map.json: article_id -> source URL, original size and the file of
+  each width.
+
+    python api/images.py --output api/.image-cache
+    python api/images.py --images data/images --output api/.image-cache --image-map app/data/imageMap.json
+    python api/images.py --images data/images --urls-from-collection --image-map app/data/imageMap.json
+
+Without --images the articles (article_id and image_url) are read from the
+collection. Local originals are keyed by --image-url-template (IMAGE_URL_TEMPLATE,
+the same default ingest.py stores), or by the collection's image_url with
+--urls-from-collection, so the map's keys match the image_url of search hits.
+--image-map adds an entry per image_url to the frontend's imageMap.json,
+pointing at /api/py/img/{article_id}?w=<width> with the file digest as a
+version, so those URLs can be cached as immutable. Entries already in the map
+(the featured images under public/) are kept.
+
+Pillow is only needed by this job, not by the API.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "image-map.json"
+DEFAULT_WIDTHS = (160, 320, 640)
+
+
+class ImageStore:
+    """The thumbnail cache as seen by the API; reloaded when the job rewrites the manifest."""
+
+    def __init__(self, path: str, default_width: int = 320):
+        self.path = path
+        self.default_width = default_width
+        self.images: Dict[str, dict] = {}
+        self.mtime = None
+        self.loaded_at = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def load(self) -> bool:
+        manifest_path = os.path.join(self.path, MANIFEST)
+        try:
+            mtime = os.stat(manifest_path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self.mtime:
+            return True
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        # Widths as sorted ints once here, not on every request
+        self.images = {
+            article_id: sorted((int(width), name) for width, name in entry["thumbnails"].items())
+            for article_id, entry in manifest["images"].items()
+        }
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        logger.info(f"Loaded image map of {len(self.images)} articles from {self.path}")
+        return True
+
+    async def watch(self, interval: float):
+        """Pick up new runs of the job without a restart; file I/O stays off the request path."""
+        while True:
+            try:
+                await asyncio.to_thread(self.load)
+            except Exception as e:
+                logger.warning(f"Failed to load image map: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def lookup(self, article_id: str, width: Optional[int] = None) -> Optional[Tuple[str, str]]:
+        """(file path, content digest) of the smallest thumbnail at least `width` wide
+        (the largest one if none is), or None if the article has no thumbnails."""
+        thumbnails = self.images.get(article_id)
+        if not thumbnails:
+            return None
+        name = pick(thumbnails, width or self.default_width)
+        return os.path.join(self.path, name), digest_of(name)
+
+    def metrics(self) -> dict:
+        return {
+            "ready": self.ready,
+            "articles": len(self.images),
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+        }
+
+
+def pick(thumbnails: List[Tuple[int, str]], width: int) -> str:
+    """File of the smallest of the (width, file) pairs, sorted by width, at least `width` wide."""
+    return next((name for w, name in thumbnails if w >= width), thumbnails[-1][1])
+
+
+def digest_of(name: str) -> str:
+    return os.path.basename(name).rsplit(".", 1)[0]
+
+
+def content_name(data: bytes) -> str:
+    digest = hashlib.blake2b(data, digest_size=12).hexdigest()
+    return f"{digest[:2]}/{digest}.webp"
+
+
+def _make_thumbnails(data: bytes, widths: List[int], quality: int) -> Tuple[Tuple[int, int], Dict[int, bytes]]:
+    """Decode an image and encode a WebP per width (never upscaled). Runs in a worker process."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        size = image.size
+        thumbnails = {}
+        for width in sorted(set(min(w, size[0]) for w in widths)):
+            height = max(1, round(size[1] * width / size[0]))
+            resized = image if width == size[0] else image.resize((width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            resized.save(out, format="WEBP", quality=quality, method=4)
+            thumbnails[width] = out.getvalue()
+    # Requested widths above the original map to the original-size thumbnail
+    return size, {w: thumbnails[min(w, size[0])] for w in widths}
+
+
+def write_file(output: str, name: str, data: bytes) -> bool:
+    """Write a content-addressed file unless it exists; returns whether it was written."""
+    path = os.path.join(output, name)
+    if os.path.exists(path):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.partial"
+    with open(partial, "wb") as f:
+        f.write(data)
+    os.replace(partial, path)
+    return True
+
+
+def load_manifest(output: str) -> dict:
+    path = os.path.join(output, MANIFEST)
+    if not os.path.exists(path):
+        return {"images": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_json(path: str, data: dict, indent: Optional[int] = None):
+    partial = path + ".partial"
+    with open(partial, "w") as f:
+        json.dump(data, f, indent=indent, separators=None if indent else (",", ":"))
+    os.replace(partial, path)
+
+
+def local_articles(images_dir: str, image_url_template: str,
+                   image_urls: Optional[Dict[str, str]] = None) -> Iterator[Tuple[str, str, str]]:
+    """(article_id, image_url, local path) for every JPEG under `images_dir` (flat or Kaggle layout).
+    With `image_urls` (article_id -> the collection's image_url), articles not in it are skipped."""
+    for root, _, files in os.walk(images_dir):
+        for name in sorted(files):
+            if name.lower().endswith((".jpg", ".jpeg")):
+                article_id = name.rsplit(".", 1)[0]
+                if image_urls is None:
+                    yield article_id, image_url_template.format(article_id=article_id), os.path.join(root, name)
+                elif article_id in image_urls:
+                    yield article_id, image_urls[article_id], os.path.join(root, name)
+
+
+def collection_articles(url: str, collection_name: str, page_size: int = 1000) -> Iterator[Tuple[str, str, str]]:
+    """(article_id, image_url, image_url) for every point of the collection."""
+    from qdrant_client import QdrantClient
+
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from main import Config
+
+    client = QdrantClient(url=url, api_key=Config.QDRANT_API_KEY if Config.QDRANT_API_KEY else None)
+    try:
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=["article_id", "image_url"],
+                with_vectors=False
+            )
+            for point in points:
+                article_id, image_url = point.payload.get("article_id"), point.payload.get("image_url")
+                if article_id and image_url:
+                    yield str(article_id), image_url, image_url
+            if offset is None:
+                break
+    finally:
+        client.close()
+
+
+def collection_image_urls(args) -> Dict[str, str]:
+    return {article_id: image_url for article_id, image_url, _ in collection_articles(args.url, args.collection)}
+
+
+def run(args) -> dict:
+    import httpx
+
+    manifest = load_manifest(args.output)
+    images: Dict[str, dict] = manifest["images"]
+    widths = sorted(args.widths)
+    articles = (
+        local_articles(args.images, args.image_url_template, collection_image_urls(args) if args.urls_from_collection else None)
+        if args.images
+        else collection_articles(args.url, args.collection)
+    )
+
+    http = httpx.Client(timeout=args.timeout, follow_redirects=True, limits=httpx.Limits(max_connections=args.download_parallel))
+
+    def fetch(source: str) -> bytes:
+        if source.startswith(("http://", "https://")):
+            response = http.get(source)
+            response.raise_for_status()
+            return response.content
+        with open(source, "rb") as f:
+            return f.read()
+
+    def is_current(article_id: str, image_url: str) -> bool:
+        entry = images.get(article_id)
+        return (
+            entry is not None and entry["source"] == image_url
+            and all(str(w) in entry["thumbnails"] for w in widths)
+            and all(os.path.exists(os.path.join(args.output, name)) for name in entry["thumbnails"].values())
+        )
+
+    stats = {"articles": 0, "current": 0, "built": 0, "failed": 0, "files_written": 0, "bytes_in": 0, "bytes_out": 0}
+    downloaders = ThreadPoolExecutor(max_workers=args.download_parallel)
+    encoders = ProcessPoolExecutor(max_workers=args.workers)
+    # future -> (stage, article_id, image_url)
+    in_flight: Dict[object, Tuple[str, str, str]] = {}
+    started = time.perf_counter()
+    last_report = started
+
+    def collect(block: bool):
+        if not in_flight:
+            return
+        finished, _ = wait(list(in_flight), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in finished:
+            stage, article_id, image_url = in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                stats["failed"] += 1
+                logger.warning(f"Failed to {stage} {article_id}: {str(e)}")
+                continue
+            if stage == "fetch":
+                stats["bytes_in"] += len(result)
+                in_flight[encoders.submit(_make_thumbnails, result, widths, args.quality)] = ("encode", article_id, image_url)
+                continue
+            size, thumbnails = result
+            names = {}
+            for width, data in thumbnails.items():
+                names[str(width)] = name = content_name(data)
+                if write_file(args.output, name, data):
+                    stats["files_written"] += 1
+                    stats["bytes_out"] += len(data)
+            images[article_id] = {"source": image_url, "size": list(size), "thumbnails": names}
+            stats["built"] += 1
+
+    os.makedirs(args.output, exist_ok=True)
+    try:
+        for article_id, image_url, source in articles:
+            if args.limit and stats["articles"] >= args.limit:
+                break
+            stats["articles"] += 1
+            if not args.force and is_current(article_id, image_url):
+                stats["current"] += 1
+                continue
+            # Bounded: fetched images wait in memory for an encoder, so cap both stages together
+            while len(in_flight) >= args.queue_size:
+                collect(block=True)
+            in_flight[downloaders.submit(fetch, source)] = ("fetch", article_id, image_url)
+            collect(block=False)
+
+            if time.perf_counter() - last_report >= args.report_seconds:
+                last_report = time.perf_counter()
+                logger.info(f"{stats['articles']} articles | {stats['built']} built | {stats['failed']} failed")
+        while in_flight:
+            collect(block=True)
+    finally:
+        downloaders.shutdown(cancel_futures=True)
+        encoders.shutdown(cancel_futures=True)
+        http.close()
+        manifest.update({"widths": widths, "quality": args.quality, "built_at": time.time(), "images": images})
+        save_json(os.path.join(args.output, MANIFEST), manifest)
+
+    if args.image_map:
+        update_image_map(args.image_map, images, args.public_path, args.map_width)
+    if args.prune:
+        stats["files_pruned"] = prune(args.output, images)
+
+    elapsed = time.perf_counter() - started
+    return {
+        **stats,
+        "seconds": round(elapsed, 2),
+        "images_per_sec": round(stats["built"] / elapsed, 1) if elapsed else 0.0,
+        "output": args.output,
+        "widths": widths,
+    }
+
+
+def update_image_map(path: str, images: Dict[str, dict], public_path: str, width: int):
+    """Point every image_url without a local file at the thumbnail endpoint, keeping existing entries."""
+    image_map = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            image_map = json.load(f)
+    added = 0
+    for article_id, entry in images.items():
+        current = image_map.get(entry["source"])
+        if current is None or current.startswith(public_path):
+            # The digest of the served file changes whenever the source image does
+            thumbnails = sorted((int(w), name) for w, name in entry["thumbnails"].items())
+            version = digest_of(pick(thumbnails, width))
+            image_map[entry["source"]] = f"{public_path}/{article_id}?w={width}&v={version}"
+            added += current is None
+    save_json(path, image_map, indent=2)
+    logger.info(f"Updated {path}: {added} new entries, {len(image_map)} total")
+
+
+def prune(output: str, images: Dict[str, dict]) -> int:
+    """Delete thumbnails no article refers to any more."""
+    referenced = {name for entry in images.values() for name in entry["thumbnails"].values()}
+    removed = 0
+    for root, _, files in os.walk(output):
+        for name in files:
+            relative = os.path.relpath(os.path.join(root, name), output).replace(os.sep, "/")
+            if name.endswith(".webp") and relative not in referenced:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+
+def parse_args():
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from main import Config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=Config.IMAGE_CACHE_DIR, help="Cache directory (defaults to IMAGE_CACHE_DIR)")
+    parser.add_argument("--images", help="Read local originals from this directory instead of fetching image_url")
+    parser.add_argument("--image-url-template", default=Config.IMAGE_URL_TEMPLATE,
+                        help="image_url recorded for local originals (defaults to IMAGE_URL_TEMPLATE, as in ingest.py)")
+    parser.add_argument("--urls-from-collection", action="store_true",
+                        help="With --images, take each article's image_url from the collection instead of the template")
+    parser.add_argument("--url", default=Config.QDRANT_URL, help="Qdrant URL to read articles from (defaults to QDRANT_URL)")
+    parser.add_argument("--collection", default=Config.COLLECTION_NAME, help="Collection to read articles from")
+    parser.add_argument("--widths", type=lambda s: [int(w) for w in s.split(",")], default=list(DEFAULT_WIDTHS),
+                        help="Comma-separated thumbnail widths")
+    parser.add_argument("--quality", type=int, default=80, help="WebP quality")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Encoding processes")
+    parser.add_argument("--download-parallel", type=int, default=16, help="Concurrent image downloads")
+    parser.add_argument("--queue-size", type=int, default=None, help="Images in flight (default 4x workers)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Download timeout in seconds")
+    parser.add_argument("--image-map", help="Frontend imageMap.json to update, e.g. app/data/imageMap.json")
+    parser.add_argument("--public-path", default="/api/py/img", help="URL prefix of the thumbnail endpoint in the image map")
+    parser.add_argument("--map-width", type=int, default=Config.IMAGE_DEFAULT_WIDTH, help="Thumbnail width the image map points at")
+    parser.add_argument("--force", action="store_true", help="Rebuild thumbnails that are already current")
+    parser.add_argument("--prune", action="store_true", help="Delete thumbnails no longer referenced")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many articles (0 = all)")
+    parser.add_argument("--report-seconds", type=float, default=10.0, help="Progress log interval")
+    args = parser.parse_args()
+    if args.queue_size is None:
+        args.queue_size = 4 * args.workers
+    return args
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    print(json.dumps(run(parse_args()), indent=2))
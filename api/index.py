@@ -7,7 +7,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import the app from main.py
-from main import app as main_app
+from main import app as main_app, lifespan as main_lifespan
 
 # Create a handler for Vercel serverless functions
 async def handler(request: Request):
@@ -20,7 +20,8 @@ async def handler(request: Request):
     return await main_app(request.scope, request.receive, request.send)
 
 # Export the handler for Vercel
-app = FastAPI()
+# Mounted apps don't get lifespan events, so run the main app's startup/shutdown here
+app = FastAPI(lifespan=main_lifespan)
 
 # Add CORS middleware
 app.add_middleware(
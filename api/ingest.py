@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion of the H&M catalog into Qdrant.
+
+Streams the articles CSV, computes CLIP image embeddings in a process pool and
+upserts points in parallel batches. Work in flight is bounded at every stage,
+so memory stays flat regardless of catalog size. Uploaded article IDs are
+appended to a checkpoint file, so an interrupted run picks up where it left off.
+
+    python api/ingest.py --articles data/articles.csv --images data/images
+    python api/ingest.py --articles data/articles.csv --images data/images --url http://localhost:6333 --recreate
+
+Images are looked up as <images>/<first 3 digits>/<article_id>.jpg (the Kaggle
+layout) or <images>/<article_id>.jpg.
+
+Each point also gets a sparse keyword vector (Qdrant/bm25 by default) of its
+text fields for hybrid search. The sparse vector must be declared when the
+collection is created, so an existing collection without it needs --recreate
+(or --no-sparse for dense-only points).
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Iterator, List, Optional, Set, Tuple
+
+from qdrant_client import QdrantClient, models
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import INGEST_STAMP_KEY, Config
+
+logger = logging.getLogger(__name__)
+
+VECTOR_SIZE = 512
+PAYLOAD_FIELDS = [
+    "article_id", "prod_name", "product_type_name", "product_group_name", "colour_group_name",
+    "perceived_colour_master_name", "department_name", "index_name", "index_group_name",
+    "section_name", "garment_group_name", "detail_desc",
+]
+# Payload fields indexed by the sparse keyword vector
+SPARSE_TEXT_FIELDS = [
+    "prod_name", "product_type_name", "product_group_name", "colour_group_name",
+    "perceived_colour_master_name", "department_name", "section_name", "garment_group_name", "detail_desc",
+]
+
+_image_encoder = None
+
+
+def _init_worker(model_name: str, cache_dir: str, threads: Optional[int]):
+    """Load the image encoder once per worker process."""
+    global _image_encoder
+    from fastembed import ImageEmbedding
+    _image_encoder = ImageEmbedding(model_name=model_name, cache_dir=cache_dir, threads=threads)
+
+
+def _embed_images(paths: List[str]) -> List[List[float]]:
+    return [vector.tolist() for vector in _image_encoder.embed(paths, batch_size=len(paths))]
+
+
+class StageStats:
+    """Item counts and throughput for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.started = time.perf_counter()
+
+    def add(self, items: int, seconds: float = 0.0):
+        self.items += items
+        self.busy += seconds
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "items": self.items,
+            "items_per_sec": round(self.items / elapsed, 1) if elapsed else 0.0,
+            "busy_seconds": round(self.busy, 2),
+        }
+
+
+def image_path(images_dir: str, article_id: str) -> Optional[str]:
+    for candidate in (
+        os.path.join(images_dir, article_id[:3], f"{article_id}.jpg"),
+        os.path.join(images_dir, f"{article_id}.jpg"),
+    ):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def read_articles(args, done: Set[str], stats: StageStats, skipped: StageStats) -> Iterator[List[Tuple[dict, str]]]:
+    """Stream (payload, image path) batches from the CSV, skipping finished and image-less articles."""
+    batch = []
+    with open(args.articles, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            article_id = row["article_id"].zfill(10)
+            if article_id in done:
+                continue
+            path = image_path(args.images, article_id)
+            if path is None:
+                skipped.add(1)
+                continue
+            payload = {field: row.get(field, "") for field in PAYLOAD_FIELDS}
+            payload["article_id"] = article_id
+            payload["image_url"] = args.image_url_template.format(article_id=article_id)
+            payload["price"] = 0.0
+            payload["available"] = True
+            batch.append((payload, path))
+            stats.add(1)
+            if len(batch) == args.embed_batch_size:
+                yield batch
+                batch = []
+            if args.limit and stats.items >= args.limit:
+                break
+    if batch:
+        yield batch
+
+
+def ensure_collection(client: QdrantClient, collection_name: str, recreate: bool, sparse: bool) -> bool:
+    """Create the collection if needed; returns whether it has the sparse keyword vector."""
+    if recreate and client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name,
+            vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE),
+            # Qdrant applies the IDF part of BM25 at query time
+            sparse_vectors_config={
+                Config.SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)
+            } if sparse else None,
+        )
+        logger.info(f"Created collection {collection_name}")
+    if not sparse:
+        return False
+    if Config.SPARSE_VECTOR_NAME not in (client.get_collection(collection_name).config.params.sparse_vectors or {}):
+        logger.warning(f"Collection {collection_name} has no sparse vector {Config.SPARSE_VECTOR_NAME!r}, "
+                       "uploading dense vectors only (use --recreate to add it)")
+        return False
+    return True
+
+
+def sparse_text(payload: dict) -> str:
+    return " ".join(str(payload[field]) for field in SPARSE_TEXT_FIELDS if payload.get(field))
+
+
+def upload(client: QdrantClient, collection_name: str, payloads: List[dict], vectors: List[List[float]],
+           sparse_encoder=None) -> Tuple[List[str], float]:
+    started = time.perf_counter()
+    if sparse_encoder is not None:
+        # "" is the collection's unnamed dense vector
+        vectors = [
+            {"": vector, Config.SPARSE_VECTOR_NAME: models.SparseVector(indices=sparse.indices.tolist(), values=sparse.values.tolist())}
+            for vector, sparse in zip(vectors, sparse_encoder.embed([sparse_text(payload) for payload in payloads]))
+        ]
+    client.upsert(
+        collection_name=collection_name,
+        points=[
+            # Numeric article IDs double as point IDs, so re-running a batch overwrites instead of duplicating
+            models.PointStruct(id=int(payload["article_id"]), vector=vector, payload=payload)
+            for payload, vector in zip(payloads, vectors)
+        ],
+        wait=True,
+    )
+    return [payload["article_id"] for payload in payloads], time.perf_counter() - started
+
+
+def stamp_collection(client: QdrantClient, collection_name: str) -> Optional[str]:
+    """Record the ingest time in the collection metadata, so the API's collection version
+    (and the HTTP ETags derived from it) also changes when points are overwritten in place."""
+    stamp = str(int(time.time()))
+    try:
+        client.update_collection(collection_name, metadata={INGEST_STAMP_KEY: stamp})
+    except Exception as e:
+        # Collection metadata needs Qdrant 1.16+; the version then falls back to the points count
+        logger.warning(f"Failed to stamp collection {collection_name}: {str(e)}")
+        return None
+    return stamp
+
+
+def run(args) -> dict:
+    if args.path:
+        # Embedded local mode isn't safe for concurrent writers
+        args.upload_parallel = 1
+    client = QdrantClient(path=args.path) if args.path else QdrantClient(
+        url=args.url,
+        api_key=Config.QDRANT_API_KEY if Config.QDRANT_API_KEY else None,
+        timeout=max(Config.QDRANT_TIMEOUT, 60),
+    )
+    sparse_encoder = None
+    if ensure_collection(client, args.collection, args.recreate, sparse=not args.no_sparse):
+        from fastembed import SparseTextEmbedding
+        # Document-side encoding (term frequencies); BM25 is cheap enough to run in the upload threads
+        sparse_encoder = SparseTextEmbedding(model_name=args.sparse_model, cache_dir=Config.MODEL_CACHE_DIR)
+
+    done = load_checkpoint(args.checkpoint)
+    if done:
+        logger.info(f"Resuming: {len(done)} articles already uploaded according to {args.checkpoint}")
+
+    read_stats, skipped_stats = StageStats("read"), StageStats("skipped")
+    embed_stats, upload_stats = StageStats("embed"), StageStats("upload")
+    checkpoint = open(args.checkpoint, "a") if args.checkpoint else None
+
+    embedders = ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(Config.IMAGE_EMBEDDING_MODEL, Config.MODEL_CACHE_DIR, args.threads_per_worker),
+    )
+    uploaders = ThreadPoolExecutor(max_workers=args.upload_parallel)
+    embedding = deque()
+    uploading = set()
+    pending_payloads: List[dict] = []
+    pending_vectors: List[List[float]] = []
+    last_report = time.perf_counter()
+
+    def drain_uploads(block: bool):
+        nonlocal uploading
+        if not uploading:
+            return
+        finished, uploading = wait(uploading, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in finished:
+            article_ids, seconds = future.result()
+            upload_stats.add(len(article_ids), seconds)
+            if checkpoint:
+                checkpoint.write("\n".join(article_ids) + "\n")
+                checkpoint.flush()
+
+    def submit_upload(final: bool = False):
+        nonlocal pending_payloads, pending_vectors
+        while len(pending_payloads) >= args.upload_batch_size or (final and pending_payloads):
+            # Bounded: wait for an upload slot before queueing more
+            while len(uploading) >= args.upload_parallel:
+                drain_uploads(block=True)
+            payloads = pending_payloads[:args.upload_batch_size]
+            vectors = pending_vectors[:args.upload_batch_size]
+            pending_payloads = pending_payloads[args.upload_batch_size:]
+            pending_vectors = pending_vectors[args.upload_batch_size:]
+            uploading.add(uploaders.submit(upload, client, args.collection, payloads, vectors, sparse_encoder))
+
+    def collect_embeddings(block: bool):
+        while embedding and (block or embedding[0][1].done()):
+            payloads, future, submitted = embedding.popleft()
+            pending_payloads.extend(payloads)
+            pending_vectors.extend(future.result())
+            embed_stats.add(len(payloads), time.perf_counter() - submitted)
+            block = False
+        submit_upload()
+
+    try:
+        for batch in read_articles(args, done, read_stats, skipped_stats):
+            # Bounded: at most `queue_size` embedding batches in flight
+            while len(embedding) >= args.queue_size:
+                collect_embeddings(block=True)
+            payloads = [payload for payload, _ in batch]
+            future = embedders.submit(_embed_images, [path for _, path in batch])
+            embedding.append((payloads, future, time.perf_counter()))
+            collect_embeddings(block=False)
+            drain_uploads(block=False)
+
+            if time.perf_counter() - last_report >= args.report_seconds:
+                last_report = time.perf_counter()
+                logger.info(
+                    f"read {read_stats.items} | embedded {embed_stats.items} "
+                    f"({embed_stats.summary()['items_per_sec']}/s) | uploaded {upload_stats.items} "
+                    f"({upload_stats.summary()['items_per_sec']}/s)"
+                )
+
+        while embedding:
+            collect_embeddings(block=True)
+        submit_upload(final=True)
+        while uploading:
+            drain_uploads(block=True)
+    finally:
+        embedders.shutdown(cancel_futures=True)
+        uploaders.shutdown()
+        if checkpoint:
+            checkpoint.close()
+
+    report = {
+        "collection": args.collection,
+        "sparse_vectors": sparse_encoder is not None,
+        "resumed_from": len(done),
+        "skipped_without_image": skipped_stats.items,
+        "stages": {
+            "read": read_stats.summary(),
+            "embed": embed_stats.summary(),
+            "upload": upload_stats.summary(),
+        },
+        "points_count": client.count(args.collection).count,
+        "ingest_stamp": stamp_collection(client, args.collection) if upload_stats.items else None,
+    }
+    client.close()
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", required=True, help="Path to the H&M articles.csv")
+    parser.add_argument("--images", required=True, help="Directory with the article images")
+    parser.add_argument("--url", default=Config.QDRANT_URL, help="Qdrant URL (defaults to QDRANT_URL)")
+    parser.add_argument("--path", help="Use an embedded on-disk Qdrant at this path instead of a server")
+    parser.add_argument("--collection", default=Config.COLLECTION_NAME, help="Collection to fill")
+    parser.add_argument("--recreate", action="store_true", help="Drop and recreate the collection first")
+    parser.add_argument("--checkpoint", default="ingest.checkpoint", help="File of uploaded article IDs, for resuming")
+    parser.add_argument("--image-url-template", default=Config.IMAGE_URL_TEMPLATE,
+                        help="image_url stored in the payload (defaults to IMAGE_URL_TEMPLATE)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Embedding processes")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="ONNX threads per embedding process")
+    parser.add_argument("--embed-batch-size", type=int, default=32, help="Images per embedding task")
+    parser.add_argument("--queue-size", type=int, default=None, help="Embedding tasks in flight (default 2x workers)")
+    parser.add_argument("--upload-batch-size", type=int, default=256, help="Points per upsert")
+    parser.add_argument("--upload-parallel", type=int, default=4, help="Concurrent upserts")
+    parser.add_argument("--sparse-model", default=Config.SPARSE_EMBEDDING_MODEL, help="Sparse keyword model for hybrid search")
+    parser.add_argument("--no-sparse", action="store_true", help="Upload dense vectors only")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many articles (0 = all)")
+    parser.add_argument("--report-seconds", type=float, default=10.0, help="Progress log interval")
+    args = parser.parse_args()
+    if args.queue_size is None:
+        args.queue_size = 2 * args.workers
+    return args
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    print(json.dumps(run(parse_args()), indent=2))
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+In-process copy of a small collection, searched with NumPy instead of a
+network round trip to Qdrant.
+
+The index lives in a directory:
+
+- vectors.npy: float32 matrix of L2-normalized vectors, memory-mapped on load,
+  so cosine similarity is a single matrix-vector product;
+- <field>.npy: one int32 category code per point for each filterable field;
+- payloads.json: the result payload fields of every point;
+- meta.json: point IDs, the category lists and the collection version the
+  index was built from.
+
+Rows are kept in Qdrant's scroll order (ascending point ID), so filter-only
+browsing can reproduce scroll pages, including next_page_offset.
+
+    python api/local_index.py --output api/.local-index
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LOCAL_FILTER_FIELDS = ("index_group_name", "product_type_name")
+# Name of the collection's unnamed dense vector; hybrid collections also hold a named sparse one
+DENSE_VECTOR = ""
+
+
+class LocalHit(NamedTuple):
+    """Quacks like the ScoredPoint/Record fields to_search_result and cursors use."""
+    id: Any
+    score: float
+    payload: dict
+
+
+class LocalIndex:
+    def __init__(self, path: str, max_points: int):
+        self.path = path
+        self.max_points = max_points
+        self.version: Optional[str] = None
+        self.vectors: Optional[np.ndarray] = None
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, Dict[str, int]] = {}
+        self.ids: List[Any] = []
+        self.sorted_ids: Optional[np.ndarray] = None
+        self.payloads: List[dict] = []
+        self.built_at = None
+        self._lock = asyncio.Lock()
+
+    def ready_for(self, version: Optional[str]) -> bool:
+        return self.vectors is not None and version is not None and self.version == version
+
+    def load(self) -> bool:
+        """Load (memory-map) the index from disk if one exists."""
+        state = read_index(self.path)
+        if state is None:
+            return False
+        self._swap(state)
+        return True
+
+    async def load_in_thread(self) -> bool:
+        """load(), with the file reads and JSON parsing off the event loop."""
+        state = await asyncio.to_thread(read_index, self.path)
+        if state is None:
+            return False
+        self._swap(state)
+        return True
+
+    def _swap(self, state: dict):
+        # Plain attribute assignments on the event loop thread, so searches never see a mix of two indexes
+        self.vectors = state["vectors"]
+        self.codes = state["codes"]
+        self.categories = state["categories"]
+        self.ids = state["ids"]
+        self.sorted_ids = state["sorted_ids"]
+        self.payloads = state["payloads"]
+        self.version = state["version"]
+        self.built_at = state["built_at"]
+        logger.info(f"Loaded local index of {len(self.ids)} points (version {self.version}) from {self.path}")
+
+    async def refresh(self, client, collection_name: str, version: str, fields: List[str]):
+        """Rebuild the index from the collection unless it already matches `version`."""
+        async with self._lock:
+            if self.ready_for(version):
+                return
+            if self.version is None and await self.load_in_thread() and self.ready_for(version):
+                return
+            count = (await client.count(collection_name, exact=True)).count
+            if count > self.max_points:
+                logger.info(f"Collection has {count} points (> {self.max_points}), not building a local index")
+                self.vectors = None
+                return
+            started = time.perf_counter()
+            await export(client, collection_name, self.path, version, fields, count=count)
+            await self.load_in_thread()
+            logger.info(f"Built local index of {count} points in {time.perf_counter() - started:.2f}s")
+
+    def _mask(self, filters: Dict[str, List[str]]) -> Optional[np.ndarray]:
+        """Boolean mask of points matching every non-empty filter (any of its values)."""
+        mask = None
+        for field, values in filters.items():
+            if not values:
+                continue
+            wanted = [self.categories[field][v] for v in values if v in self.categories[field]]
+            field_mask = np.isin(self.codes[field], wanted)
+            mask = field_mask if mask is None else mask & field_mask
+        return mask
+
+    def search(self, query_vector: np.ndarray, filters: Dict[str, List[str]], limit: int, offset: int) -> List[LocalHit]:
+        """Exact cosine top-k over the points matching the filters."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        mask = self._mask(filters)
+        rows = np.arange(len(self.ids)) if mask is None else np.flatnonzero(mask)
+        scores = (self.vectors if mask is None else self.vectors[rows]) @ query
+
+        k = min(offset + limit, len(rows))
+        if k <= offset:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        # Ties broken by row so pages are stable
+        top = top[np.lexsort((rows[top], -scores[top]))][offset:]
+        return [LocalHit(self.ids[rows[i]], float(scores[i]), self.payloads[rows[i]]) for i in top]
+
+    def can_scroll(self) -> bool:
+        return self.sorted_ids is not None
+
+    def scroll(self, filters: Dict[str, List[str]], limit: int, start_id: int) -> Tuple[List[LocalHit], Optional[int]]:
+        """Same page as Qdrant's scroll from point ID `start_id`, with its next_page_offset."""
+        mask = self._mask(filters)
+        first = int(np.searchsorted(self.sorted_ids, start_id))
+        rows = np.arange(first, len(self.ids)) if mask is None else first + np.flatnonzero(mask[first:])
+        page = rows[:limit]
+        next_offset = self.ids[rows[limit]] if len(rows) > limit else None
+        return [LocalHit(self.ids[row], 1.0, self.payloads[row]) for row in page], next_offset
+
+    def metrics(self) -> dict:
+        return {
+            "ready": self.vectors is not None,
+            "points": len(self.ids),
+            "version": self.version,
+            "max_points": self.max_points,
+            "built_at": self.built_at,
+        }
+
+
+def dense_vector(vector):
+    """The dense vector of a point, whether it came back alone or keyed by name."""
+    return vector[DENSE_VECTOR] if isinstance(vector, dict) else vector
+
+
+def read_index(path: str) -> Optional[dict]:
+    """Everything load() swaps in, read from `path`; None if there is no index there."""
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    with open(os.path.join(path, "payloads.json")) as f:
+        payloads = json.load(f)
+    ids = meta["ids"]
+    return {
+        "vectors": np.load(os.path.join(path, "vectors.npy"), mmap_mode="r"),
+        "codes": {
+            field: np.load(os.path.join(path, f"{field}.npy"), mmap_mode="r")
+            for field in LOCAL_FILTER_FIELDS
+        },
+        "categories": {
+            field: {value: code for code, value in enumerate(values)}
+            for field, values in meta["categories"].items()
+        },
+        "ids": ids,
+        # Scroll pages can only be reproduced when IDs are integers (UUID order differs)
+        "sorted_ids": np.asarray(ids, dtype=np.int64) if all(isinstance(i, int) for i in ids) else None,
+        "payloads": payloads,
+        "version": meta["version"],
+        "built_at": meta["built_at"],
+    }
+
+
+async def export(client, collection_name: str, path: str, version: str, fields: List[str],
+                 batch_size: int = 1000, count: Optional[int] = None):
+    """Write the collection's vectors, filter codes and result payloads to `path`."""
+    if count is None:
+        count = (await client.count(collection_name, exact=True)).count
+    # Vectors go straight into a float32 matrix, one page at a time: Python float lists
+    # would cost ~8x the memory of the index itself
+    matrix = None
+    ids, payloads = [], []
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=fields,
+            with_vectors=[DENSE_VECTOR]
+        )
+        if points and matrix is None:
+            matrix = np.empty((max(count, len(points)), len(dense_vector(points[0].vector))), dtype=np.float32)
+        if matrix is not None and len(ids) + len(points) > len(matrix):
+            # Points were added since the count
+            matrix = np.concatenate([matrix, np.empty((len(ids) + len(points) - len(matrix), matrix.shape[1]), dtype=np.float32)])
+        for row, point in enumerate(points, start=len(ids)):
+            matrix[row] = dense_vector(point.vector)
+        ids.extend(point.id for point in points)
+        payloads.extend(point.payload for point in points)
+        if offset is None:
+            break
+
+    matrix = matrix[:len(ids)] if matrix is not None else np.empty((0, 0), dtype=np.float32)
+    # Normalizing, encoding and writing would block the event loop for seconds on large indexes
+    await asyncio.to_thread(write_index, path, matrix, ids, payloads, version)
+
+
+def write_index(path: str, matrix: np.ndarray, ids: List[Any], payloads: List[dict], version: str):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+    categories = {
+        field: sorted({payload.get(field, "") for payload in payloads})
+        for field in LOCAL_FILTER_FIELDS
+    }
+
+    # Write next to the live index and swap it in, so readers never see half an index
+    partial = path.rstrip("/") + ".partial"
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    np.save(os.path.join(partial, "vectors.npy"), matrix)
+    for field, values in categories.items():
+        code = {value: i for i, value in enumerate(values)}
+        np.save(os.path.join(partial, f"{field}.npy"), np.asarray([code[p.get(field, "")] for p in payloads], dtype=np.int32))
+    with open(os.path.join(partial, "payloads.json"), "w") as f:
+        json.dump(payloads, f, separators=(",", ":"))
+    with open(os.path.join(partial, "meta.json"), "w") as f:
+        json.dump({"version": version, "ids": ids, "categories": categories, "built_at": time.time()}, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(partial, path)
+
+
+async def export_index(output: str):
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from main import RESULT_PAYLOAD_FIELDS, Config, QdrantService
+
+    service = QdrantService()
+    try:
+        version = await service.refresh_collection_version()
+        await export(service.client, Config.COLLECTION_NAME, output, version, RESULT_PAYLOAD_FIELDS)
+        logger.info(f"Exported local index of {Config.COLLECTION_NAME} (version {version}) to {output}")
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="api/.local-index", help="Index directory to write")
+    args = parser.parse_args()
+    asyncio.run(export_index(args.output))
@@ -1,14 +1,40 @@
 try:
-    from fastapi import FastAPI, HTTPException, Query
+    from fastapi import FastAPI, HTTPException, Query, Request, Response
+    from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
     from fastapi.middleware.cors import CORSMiddleware
-    from qdrant_client import QdrantClient
-    from fastembed import TextEmbedding
-    from typing import List
+    from fastapi.middleware.gzip import GZipMiddleware
+    from qdrant_client import AsyncQdrantClient, models
+    from typing import AsyncIterator, List, Optional, Tuple
     from pydantic import BaseModel
     from urllib.parse import unquote
+    from contextlib import asynccontextmanager
+    import asyncio
+    import time
+    import numpy as np
     import os
+    import sys
     import logging
     from dotenv import load_dotenv
+    import orjson
+
+    # Make sibling modules importable whether this runs as `main` or `api.main`
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from embedding import EmbeddingCache, EmbeddingScheduler, normalize_query
+    from encoders import load_encoder, load_sparse_encoder
+    from cache import ResultCache, SingleFlight, canonical_filter
+    from facets import FacetIndex
+    from featured import FeaturedSnapshot
+    from health import HealthProber
+    from images import ImageStore
+    from http_cache import accepts_gzip, cache_control, compress, gzip_etag, is_cacheable, make_etag, match_etag
+    from local_index import LocalIndex
+    from resilience import CircuitBreaker, QdrantUnavailable, ResilientClient, endpoint_budget, parse_budgets, start_budget
+    from suggest import SuggestIndex
+    from metrics import Metrics, begin_request, sampled, server_timing, span
+    from pagination import (
+        NEXT_CURSOR_HEADER, InvalidCursor, SearchWindow, WindowCache,
+        decode_cursor, encode_cursor, next_search_cursor, request_fingerprint
+    )
 except ImportError as e:
     print(f"Failed to import required modules: {str(e)}")
     raise
@@ -27,8 +53,93 @@ class Config:
     COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "h&m-mini")
     # Using the appropriate text model for CLIP embeddings
     TEXT_EMBEDDING_MODEL = "Qdrant/clip-ViT-B-32-text"  # The text encoder part of CLIP
+    IMAGE_EMBEDDING_MODEL = "Qdrant/clip-ViT-B-32-vision"  # The matching image encoder, used for ingestion
+    # Where fastembed keeps downloaded models; point it at a persistent path so restarts don't re-download
+    MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model-cache"))
+    # Query encoder: fastembed, onnx-int8 or sentence-transformers; threads per encoder session (unset = all cores)
+    ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "fastembed")
+    ENCODER_THREADS = int(os.getenv("ENCODER_THREADS")) if os.getenv("ENCODER_THREADS") else None
+    ENCODER_CPU_MEM_ARENA = os.getenv("ENCODER_CPU_MEM_ARENA", "true").lower() == "true"
+    # Hybrid search: keyword (sparse) and CLIP (dense) candidates fused with RRF inside Qdrant.
+    # Used when the collection has the sparse vector (see ingest.py)
+    HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+    SPARSE_EMBEDDING_MODEL = os.getenv("SPARSE_EMBEDDING_MODEL", "Qdrant/bm25")
+    SPARSE_VECTOR_NAME = os.getenv("SPARSE_VECTOR_NAME", "bm25")
+    HYBRID_PREFETCH_LIMIT = int(os.getenv("HYBRID_PREFETCH_LIMIT", "100"))
+    # Search-time HNSW ef and int8 rescoring oversampling of the collection profile in use
+    # (see `check_qdrant.py apply`); unset = Qdrant's defaults (ef = ef_construct, no oversampling)
+    SEARCH_HNSW_EF = int(os.getenv("SEARCH_HNSW_EF")) if os.getenv("SEARCH_HNSW_EF") else None
+    SEARCH_OVERSAMPLING = float(os.getenv("SEARCH_OVERSAMPLING")) if os.getenv("SEARCH_OVERSAMPLING") else None
     GROUP_ORDER = ["Menswear", "Ladieswear", "Divided", "Baby/Children", "Sport"]
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    # Client tuning: per-call timeout (seconds) and size of the shared HTTP connection pool
+    QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))
+    QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "16"))
+    # Resilience layer around every Qdrant read (see resilience.py)
+    QDRANT_RESILIENCE_ENABLED = os.getenv("QDRANT_RESILIENCE_ENABLED", "true").lower() == "true"
+    QDRANT_CALL_TIMEOUT = float(os.getenv("QDRANT_CALL_TIMEOUT", "3"))
+    QDRANT_RETRIES = int(os.getenv("QDRANT_RETRIES", "2"))
+    QDRANT_RETRY_BACKOFF_MS = float(os.getenv("QDRANT_RETRY_BACKOFF_MS", "50"))
+    QDRANT_HEDGE_ENABLED = os.getenv("QDRANT_HEDGE_ENABLED", "false").lower() == "true"
+    QDRANT_HEDGE_MIN_SAMPLES = int(os.getenv("QDRANT_HEDGE_MIN_SAMPLES", "50"))
+    QDRANT_BREAKER_FAILURES = int(os.getenv("QDRANT_BREAKER_FAILURES", "5"))
+    QDRANT_BREAKER_RESET_SECONDS = float(os.getenv("QDRANT_BREAKER_RESET_SECONDS", "10"))
+    QDRANT_RECONNECT_MAX_SECONDS = float(os.getenv("QDRANT_RECONNECT_MAX_SECONDS", "30"))
+    # Per-endpoint latency budgets in ms; Qdrant calls are cut short to fit them
+    LATENCY_BUDGETS = parse_budgets(os.getenv("LATENCY_BUDGETS_MS", "search=2500,search/batch=4000,similar=2500,featured=2500"))
+    # Query embedding micro-batching: wait up to EMBED_BATCH_WINDOW_MS or EMBED_MAX_BATCH_SIZE queries
+    EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+    EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))
+    EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+    # Query embedding cache: bounded by entries and bytes, entries expire after the TTL
+    EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "10000"))
+    EMBED_CACHE_MAX_BYTES = int(os.getenv("EMBED_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    EMBED_CACHE_TTL_SECONDS = float(os.getenv("EMBED_CACHE_TTL_SECONDS", "3600"))
+    # Optional text file with one top query per line, embedded into the cache on startup
+    EMBED_CACHE_WARMUP_FILE = os.getenv("EMBED_CACHE_WARMUP_FILE", "")
+    # Search response cache, invalidated whenever the collection version (points count) changes
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "2048"))
+    RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+    # Vector search cursors: hits held across all cursor windows, and the deepest hit a window holds
+    # (deeper pages are fetched by offset)
+    SEARCH_WINDOW_MAX_HITS = int(os.getenv("SEARCH_WINDOW_MAX_HITS", "20000"))
+    SEARCH_WINDOW_MAX_DEPTH = int(os.getenv("SEARCH_WINDOW_MAX_DEPTH", "1000"))
+    COLLECTION_VERSION_CHECK_SECONDS = float(os.getenv("COLLECTION_VERSION_CHECK_SECONDS", "30"))
+    # In-memory facet index (groups, product types, colours), rebuilt in the background
+    FACET_REFRESH_SECONDS = float(os.getenv("FACET_REFRESH_SECONDS", "300"))
+    # Featured products snapshot served from memory; optionally seeded from an exported JSON file
+    FEATURED_SNAPSHOT_LIMIT = int(os.getenv("FEATURED_SNAPSHOT_LIMIT", "8"))
+    FEATURED_REFRESH_SECONDS = float(os.getenv("FEATURED_REFRESH_SECONDS", "600"))
+    FEATURED_SNAPSHOT_FILE = os.getenv("FEATURED_SNAPSHOT_FILE", "")
+    # Maximum number of searches in one /search/batch request
+    SEARCH_BATCH_MAX_SIZE = int(os.getenv("SEARCH_BATCH_MAX_SIZE", "32"))
+    SUGGEST_MAX_LIMIT = int(os.getenv("SUGGEST_MAX_LIMIT", "20"))
+    # Points fetched per scroll page by /export
+    EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+    # article_id -> point ID lookups for /similar
+    POINT_ID_CACHE_MAX_ENTRIES = int(os.getenv("POINT_ID_CACHE_MAX_ENTRIES", "50000"))
+    POINT_ID_CACHE_TTL_SECONDS = float(os.getenv("POINT_ID_CACHE_TTL_SECONDS", "86400"))
+    # In-process NumPy copy of small collections; searches skip the Qdrant round trip while it's current
+    LOCAL_INDEX_ENABLED = os.getenv("LOCAL_INDEX_ENABLED", "false").lower() == "true"
+    LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".local-index"))
+    LOCAL_INDEX_MAX_POINTS = int(os.getenv("LOCAL_INDEX_MAX_POINTS", "200000"))
+    # Fraction of requests that get verbose per-request logging
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+    # ETag/Cache-Control for catalog-level responses (groups, facets, featured, filter-only search)
+    HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+    HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+    HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", "600"))
+    GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+    # Background health probes served by / and /api/py/diagnostic; percentiles cover the last HEALTH_PROBE_WINDOW probes
+    HEALTH_PROBE_SECONDS = float(os.getenv("HEALTH_PROBE_SECONDS", "15"))
+    HEALTH_PROBE_WINDOW = int(os.getenv("HEALTH_PROBE_WINDOW", "120"))
+    # WebP thumbnails built by images.py and served by /img/{article_id}
+    IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".image-cache"))
+    IMAGE_DEFAULT_WIDTH = int(os.getenv("IMAGE_DEFAULT_WIDTH", "320"))
+    IMAGE_CACHE_MAX_AGE = int(os.getenv("IMAGE_CACHE_MAX_AGE", "86400"))
+    IMAGE_MAP_CHECK_SECONDS = float(os.getenv("IMAGE_MAP_CHECK_SECONDS", "60"))
+    # Catalog image_url of an article: ingest.py stores it, images.py keys local originals by it
+    IMAGE_URL_TEMPLATE = os.getenv("IMAGE_URL_TEMPLATE", "https://res.cloudinary.com/df5xhsi8g/image/upload/v1730357531/handm_images/{article_id}.jpg")
 
 class SearchResult(BaseModel):
     image_url: str
@@ -45,238 +156,1003 @@ class SearchResult(BaseModel):
     class Config:
         from_attributes = True
 
+class SearchRequest(BaseModel):
+    query: str = ""
+    groups: List[str] = []
+    items: List[str] = []
+    limit: int = 20
+    offset: int = 0
+
+# The only payload keys SearchResult is built from; Qdrant returns just these
+RESULT_PAYLOAD_FIELDS = [
+    "image_url", "prod_name", "detail_desc", "product_type_name", "index_group_name",
+    "price", "article_id", "available", "colour_group_name", "size",
+]
+
+# Collection metadata key ingest.py sets after every run; part of the collection version
+INGEST_STAMP_KEY = "ingest_stamp"
+
+# Text the health prober encodes to time the query encoders
+HEALTH_PROBE_QUERY = "health check"
+
+def vector_search_params() -> Optional[models.SearchParams]:
+    """Search params for dense vector queries, so the API searches the way `check_qdrant.py compare` measured."""
+    if Config.SEARCH_HNSW_EF is None and Config.SEARCH_OVERSAMPLING is None:
+        return None
+    return models.SearchParams(
+        hnsw_ef=Config.SEARCH_HNSW_EF,
+        quantization=models.QuantizationSearchParams(
+            rescore=True, oversampling=Config.SEARCH_OVERSAMPLING
+        ) if Config.SEARCH_OVERSAMPLING is not None else None
+    )
+
+SEARCH_PARAMS = vector_search_params()
+
+# SearchResult fields whose payload key differs from the field name
+RESULT_FIELD_KEYS = {"color": "colour_group_name"}
+
+def to_search_result(hit) -> dict:
+    """Map a Qdrant point's payload to a dict in the SearchResult shape.
+    
+    Plain dicts skip per-hit model validation; SearchResult stays the documented schema.
+    """
+    payload = hit.payload
+    return {
+        "image_url": payload.get('image_url', ''),
+        "prod_name": payload.get('prod_name', 'Unknown Product'),
+        "detail_desc": payload.get('detail_desc', 'No description available'),
+        "product_type_name": payload.get('product_type_name', ''),
+        "index_group_name": payload.get('index_group_name', ''),
+        "price": float(payload.get('price', 0.0)),
+        "article_id": payload.get('article_id', ''),
+        "available": payload.get('available', True),
+        "color": payload.get('colour_group_name', ''),
+        "size": payload.get('size', '')
+    }
+
+def json_response(content, headers: dict = None, status_code: int = 200) -> Response:
+    """Serialize straight to response bytes with orjson, bypassing response_model re-validation."""
+    with span("serialize"):
+        return Response(content=orjson.dumps(content), status_code=status_code, media_type="application/json", headers=headers)
+
+def error_status(e: Exception) -> int:
+    """503 when Qdrant is unavailable (timed out, failing or circuit open), so clients retry; else 500."""
+    return 503 if isinstance(e, QdrantUnavailable) else 500
+
+def load_text_encoder():
+    """Load the configured CLIP text encoder from MODEL_CACHE_DIR (downloading it once) and run a warm-up inference."""
+    started = time.perf_counter()
+    encoder = load_encoder(
+        Config.ENCODER_BACKEND,
+        Config.TEXT_EMBEDDING_MODEL,
+        Config.MODEL_CACHE_DIR,
+        threads=Config.ENCODER_THREADS,
+        cpu_mem_arena=Config.ENCODER_CPU_MEM_ARENA
+    )
+    list(encoder.embed(["warm up"]))
+    logger.info(f"Loaded and warmed up {Config.TEXT_EMBEDDING_MODEL} ({Config.ENCODER_BACKEND}) in {time.perf_counter() - started:.2f}s")
+    return encoder
+
 class QdrantService:
-    def __init__(self):
+    def __init__(self, client: AsyncQdrantClient = None, encoder=None):
         logger.info(f"Connecting to Qdrant at {Config.QDRANT_URL}")
         try:
-            # First try to connect to Qdrant
-            self.client = QdrantClient(
+            # One async client per worker so every request shares the same connection pool
+            # and Qdrant round trips never block the event loop
+            self.client = client or AsyncQdrantClient(
                 url=Config.QDRANT_URL,
-                api_key=Config.QDRANT_API_KEY if Config.QDRANT_API_KEY else None
+                api_key=Config.QDRANT_API_KEY if Config.QDRANT_API_KEY else None,
+                timeout=Config.QDRANT_TIMEOUT,
+                pool_size=Config.QDRANT_POOL_SIZE
             )
-            logger.info(f"Successfully connected to Qdrant")
+            logger.info(f"Created async Qdrant client (timeout={Config.QDRANT_TIMEOUT}s, pool_size={Config.QDRANT_POOL_SIZE})")
+            if Config.QDRANT_RESILIENCE_ENABLED:
+                self.client = ResilientClient(
+                    self.client,
+                    call_timeout=Config.QDRANT_CALL_TIMEOUT,
+                    retries=Config.QDRANT_RETRIES,
+                    backoff_base=Config.QDRANT_RETRY_BACKOFF_MS / 1000,
+                    hedge=Config.QDRANT_HEDGE_ENABLED,
+                    hedge_min_samples=Config.QDRANT_HEDGE_MIN_SAMPLES,
+                    breaker=CircuitBreaker(Config.QDRANT_BREAKER_FAILURES, Config.QDRANT_BREAKER_RESET_SECONDS)
+                )
             
-            # Verify connection by making a simple call
-            try:
-                collection_info = self.client.get_collection(Config.COLLECTION_NAME)
-                logger.info(f"Successfully verified collection {Config.COLLECTION_NAME}")
-                logger.info(f"Collection info: {collection_info}")
-            except Exception as e:
-                logger.error(f"Failed to get collection info: {str(e)}")
-                raise Exception(f"Failed to access collection {Config.COLLECTION_NAME}: {str(e)}")
+            self.result_cache = ResultCache(
+                max_entries=Config.RESULT_CACHE_MAX_ENTRIES,
+                ttl_seconds=Config.RESULT_CACHE_TTL_SECONDS
+            )
+            self.single_flight = SingleFlight()
+            # Hits behind vector search cursors, bounded by the number of hits held
+            self.search_windows = WindowCache(
+                max_hits=Config.SEARCH_WINDOW_MAX_HITS,
+                ttl_seconds=Config.RESULT_CACHE_TTL_SECONDS
+            )
+            self.point_ids = ResultCache(
+                max_entries=Config.POINT_ID_CACHE_MAX_ENTRIES,
+                ttl_seconds=Config.POINT_ID_CACHE_TTL_SECONDS
+            )
+            self.collection_version = None
+            # Set once the collection has been verified (see connect)
+            self.connected = asyncio.Event()
+            self.facet_index = FacetIndex()
+            self.suggestions = SuggestIndex(max_limit=Config.SUGGEST_MAX_LIMIT)
+            self.featured = FeaturedSnapshot(Config.FEATURED_SNAPSHOT_LIMIT)
+            self.local_index = LocalIndex(Config.LOCAL_INDEX_DIR, Config.LOCAL_INDEX_MAX_POINTS) if Config.LOCAL_INDEX_ENABLED else None
+            self.health = HealthProber(Config.HEALTH_PROBE_WINDOW)
             
-            # Initialize TextEmbedding with CLIP model
-            try:
-                self.encoder = TextEmbedding(model_name=Config.TEXT_EMBEDDING_MODEL)
-                logger.info(f"Initialized TextEmbedding with model {Config.TEXT_EMBEDDING_MODEL}")
-            except Exception as e:
-                logger.error(f"Failed to initialize TextEmbedding: {str(e)}")
-                raise Exception(f"Failed to initialize embedding model {Config.TEXT_EMBEDDING_MODEL}: {str(e)}")
+            # The CLIP text encoder is loaded by load_encoder(), off the startup path
+            self.encoder = encoder
+            self._encoder_loading = None
+            self.embedder = EmbeddingScheduler(
+                self.encoder,
+                window_ms=Config.EMBED_BATCH_WINDOW_MS,
+                max_batch_size=Config.EMBED_MAX_BATCH_SIZE,
+                workers=Config.EMBED_WORKERS
+            )
+            self.embedding_cache = EmbeddingCache(
+                max_entries=Config.EMBED_CACHE_MAX_ENTRIES,
+                max_bytes=Config.EMBED_CACHE_MAX_BYTES,
+                ttl_seconds=Config.EMBED_CACHE_TTL_SECONDS
+            )
+            # Sparse keyword encoder for hybrid search, batched and cached the same way
+            self.hybrid = False
+            self.sparse_encoder = None
+            self._sparse_encoder_loading = None
+            self.sparse_embedder = EmbeddingScheduler(
+                None,
+                window_ms=Config.EMBED_BATCH_WINDOW_MS,
+                max_batch_size=Config.EMBED_MAX_BATCH_SIZE,
+                workers=1
+            )
+            self.sparse_cache = EmbeddingCache(
+                max_entries=Config.EMBED_CACHE_MAX_ENTRIES,
+                max_bytes=Config.EMBED_CACHE_MAX_BYTES,
+                ttl_seconds=Config.EMBED_CACHE_TTL_SECONDS
+            )
             
         except Exception as e:
             logger.error(f"Failed to initialize Qdrant service: {str(e)}")
             raise
 
-    def create_filter(self, groups: List[str] = None, items: List[str] = None) -> dict:
+    async def verify_collection(self):
+        """Verify the connection by fetching the collection info."""
+        try:
+            collection_info = await self.client.get_collection(Config.COLLECTION_NAME)
+            logger.info(f"Successfully verified collection {Config.COLLECTION_NAME} ({collection_info.points_count} points, status {collection_info.status})")
+        except Exception as e:
+            logger.error(f"Failed to get collection info: {str(e)}")
+            raise Exception(f"Failed to access collection {Config.COLLECTION_NAME}: {str(e)}")
+        self._set_collection_version(collection_info)
+        self.connected.set()
+
+    def _set_collection_version(self, collection_info):
+        # The ingest stamp also catches re-ingests that overwrite points without changing the count
+        # (collection metadata only exists in qdrant-client/Qdrant 1.16+)
+        stamp = (getattr(collection_info.config, "metadata", None) or {}).get(INGEST_STAMP_KEY)
+        version = f"{collection_info.points_count}-{stamp}" if stamp else str(collection_info.points_count)
+        sparse_vectors = collection_info.config.params.sparse_vectors or {}
+        self.hybrid = Config.HYBRID_SEARCH_ENABLED and Config.SPARSE_VECTOR_NAME in sparse_vectors
+        if version != self.collection_version:
+            if self.collection_version is not None:
+                logger.info(f"Collection version changed {self.collection_version} -> {version}, invalidating cached results")
+            self.collection_version = version
+            self.result_cache.clear()
+            self.search_windows.clear()
+
+    async def refresh_collection_version(self) -> str:
+        """Re-read the points count and drop cached results if the collection changed."""
+        self._set_collection_version(await self.client.get_collection(Config.COLLECTION_NAME))
+        return self.collection_version
+
+    async def watch_collection_version(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            previous = self.collection_version
+            try:
+                await self.refresh_collection_version()
+            except Exception as e:
+                logger.warning(f"Failed to refresh collection version: {str(e)}")
+            await self.refresh_local_index()
+            if previous is not None and self.collection_version != previous:
+                # Keep typeahead, facets and featured products (and so their HTTP ETags, which
+                # follow the version) in step with ingestion instead of waiting for a refresh
+                for name, refresh in (
+                    ("suggest index", lambda: self.suggestions.refresh(self.client, Config.COLLECTION_NAME)),
+                    ("facet index", lambda: self.facet_index.refresh(self.client, Config.COLLECTION_NAME)),
+                    ("featured products snapshot", self.refresh_featured),
+                ):
+                    try:
+                        await refresh()
+                    except Exception as e:
+                        logger.warning(f"Failed to refresh {name}: {str(e)}")
+
+    async def refresh_local_index(self):
+        """Rebuild the local index when the collection version moved past it."""
+        if self.local_index is None or self.collection_version is None:
+            return
+        try:
+            await self.local_index.refresh(self.client, Config.COLLECTION_NAME, self.collection_version, RESULT_PAYLOAD_FIELDS)
+        except Exception as e:
+            logger.warning(f"Failed to refresh local index: {str(e)}")
+
+    async def load_encoder(self):
+        """Load the text encoder in a worker thread; concurrent callers wait for the same load."""
+        if self.encoder is not None:
+            return
+        if self._encoder_loading is None:
+            self._encoder_loading = asyncio.ensure_future(asyncio.to_thread(load_text_encoder))
+        try:
+            encoder = await asyncio.shield(self._encoder_loading)
+        except Exception as e:
+            # Let the next caller retry instead of caching the failure
+            self._encoder_loading = None
+            raise Exception(f"Failed to initialize embedding model {Config.TEXT_EMBEDDING_MODEL}: {str(e)}")
+        self.encoder = self.embedder.encoder = encoder
+
+    async def load_sparse_encoder(self):
+        """Load the sparse keyword encoder in a worker thread; concurrent callers wait for the same load."""
+        if self.sparse_encoder is not None:
+            return
+        if self._sparse_encoder_loading is None:
+            self._sparse_encoder_loading = asyncio.ensure_future(asyncio.to_thread(
+                load_sparse_encoder, Config.SPARSE_EMBEDDING_MODEL, Config.MODEL_CACHE_DIR, Config.ENCODER_THREADS
+            ))
+        try:
+            encoder = await asyncio.shield(self._sparse_encoder_loading)
+        except Exception as e:
+            self._sparse_encoder_loading = None
+            raise Exception(f"Failed to initialize sparse embedding model {Config.SPARSE_EMBEDDING_MODEL}: {str(e)}")
+        self.sparse_encoder = self.sparse_embedder.encoder = encoder
+
+    async def connect(self):
+        """Verify the collection, retrying with backoff until Qdrant is reachable."""
+        delay = 1.0
+        while True:
+            try:
+                await self.verify_collection()
+                return
+            except Exception as e:
+                logger.error(f"Failed to initialize Qdrant service: {str(e)}, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, Config.QDRANT_RECONNECT_MAX_SECONDS)
+
+    async def warm_up(self, warmup_queries: List[str] = None):
+        """Startup work that runs after the server is already accepting connections."""
+        # The encoder loads while we wait for Qdrant
+        encoder_loading = asyncio.ensure_future(self.load_encoder())
+        await self.connect()
+        await self.refresh_local_index()
+        try:
+            await encoder_loading
+            if self.hybrid:
+                await self.load_sparse_encoder()
+            if warmup_queries:
+                await self.warm_embedding_cache(warmup_queries)
+        except Exception as e:
+            logger.error(str(e))
+
+    def health_checks(self) -> dict:
+        """Checks for the health prober; encoders are only probed once loaded."""
+        checks = {"qdrant": self.probe_qdrant}
+        if self.encoder is not None:
+            checks["encoder"] = lambda: self.probe_encoder(self.embedder)
+        if self.hybrid and self.sparse_encoder is not None:
+            checks["sparse_encoder"] = lambda: self.probe_encoder(self.sparse_embedder)
+        return checks
+
+    async def probe_qdrant(self) -> dict:
+        """One round trip on the pooled client, reporting the collection stats."""
+        collection_info = await self.client.get_collection(Config.COLLECTION_NAME)
+        return {
+            "collection": {
+                "collection_status": str(collection_info.status.value),
+                "points_count": collection_info.points_count,
+                "indexed_vectors_count": collection_info.indexed_vectors_count,
+                "segments_count": collection_info.segments_count,
+                "vector_size": getattr(collection_info.config.params.vectors, "size", None),
+            }
+        }
+
+    async def probe_encoder(self, embedder: EmbeddingScheduler):
+        # Through the scheduler but not the cache, so the latency includes queueing
+        await embedder.embed(HEALTH_PROBE_QUERY)
+
+    def readiness(self) -> dict:
+        return {
+            "collection_verified": self.collection_version is not None,
+            "encoder_loaded": self.encoder is not None,
+            "sparse_encoder_loaded": not self.hybrid or self.sparse_encoder is not None,
+        }
+
+    async def embed_query(self, query: str) -> np.ndarray:
+        """Return the query vector, from the cache when this query was seen recently."""
+        key = normalize_query(query)
+        vector = self.embedding_cache.get(key)
+        if vector is None:
+            # Requests arriving before the background load finishes wait for it
+            await self.load_encoder()
+            vector = self.embedding_cache.put(key, await self.embedder.embed(key))
+        return vector
+
+    async def embed_sparse_query(self, query: str) -> models.SparseVector:
+        """Return the sparse keyword vector of the query, from the cache when seen recently."""
+        key = normalize_query(query)
+        vector = self.sparse_cache.get(key)
+        if vector is None:
+            await self.load_sparse_encoder()
+            vector = self.sparse_cache.put(key, await self.sparse_embedder.embed(key))
+        return models.SparseVector(indices=vector.indices.tolist(), values=vector.values.tolist())
+
+    async def embed_query_vectors(self, query: str, hybrid: bool) -> Tuple[np.ndarray, Optional[models.SparseVector]]:
+        """Dense query vector, plus the sparse one (encoded concurrently) in hybrid mode."""
+        if not hybrid:
+            return await self.embed_query(query), None
+        dense, sparse = await asyncio.gather(self.embed_query(query), self.embed_sparse_query(query))
+        return dense, sparse
+
+    def vector_query(self, query_vector: np.ndarray, sparse_vector: Optional[models.SparseVector],
+                     conditions: models.Filter, depth: int) -> Tuple[object, Optional[List[models.Prefetch]]]:
+        """`query` and `prefetch` for a Query API request: the dense vector alone, or in hybrid
+        mode dense and sparse candidates (top `depth` each) fused with RRF by Qdrant."""
+        if sparse_vector is None:
+            return query_vector.tolist(), None
+        depth = max(depth, Config.HYBRID_PREFETCH_LIMIT)
+        prefetch = [
+            models.Prefetch(query=query_vector.tolist(), filter=conditions, limit=depth, params=SEARCH_PARAMS),
+            models.Prefetch(query=sparse_vector, using=Config.SPARSE_VECTOR_NAME, filter=conditions, limit=depth),
+        ]
+        return models.FusionQuery(fusion=models.Fusion.RRF), prefetch
+
+    async def warm_embedding_cache(self, queries: List[str]):
+        """Embed a list of top queries up front; they are batched by the scheduler."""
+        queries = [q for q in queries if q.strip()]
+        await asyncio.gather(*(self.embed_query_vectors(q, self.hybrid) for q in queries))
+        logger.info(f"Warmed embedding cache with {len(queries)} queries")
+
+    async def close(self):
+        self.embedder.close()
+        self.sparse_embedder.close()
+        await self.client.close()
+
+    def create_filter(self, groups: List[str] = None, items: List[str] = None) -> models.Filter:
         must_conditions = []
         if groups and len(groups) > 0:
-            must_conditions.append({
-                "key": "index_group_name",
-                "match": {"any": groups}
-            })
+            must_conditions.append(models.FieldCondition(
+                key="index_group_name",
+                match=models.MatchAny(any=groups)
+            ))
         if items and len(items) > 0:
-            must_conditions.append({
-                "key": "product_type_name",
-                "match": {"any": items}
-            })
-        return {"must": must_conditions} if must_conditions else None
+            must_conditions.append(models.FieldCondition(
+                key="product_type_name",
+                match=models.MatchAny(any=items)
+            ))
+        return models.Filter(must=must_conditions) if must_conditions else None
 
     async def search(self, query: str, groups: List[str], items: List[str], 
-                    limit: int, offset: int) -> List[SearchResult]:
+                    limit: int, offset: int, cursor: str = None) -> Tuple[List[dict], Optional[str]]:
+        """Return one page of results and the cursor for the next page (None on the last page)."""
+        # Identical requests share a cached response, or one in-flight computation
+        key = (
+            "search", self.collection_version, normalize_query(query),
+            canonical_filter(groups), canonical_filter(items), limit, offset, cursor
+        )
+        page = self.result_cache.get(key)
+        if page is not None:
+            return page
+
+        async def compute():
+            page = await self._search(query, groups, items, limit, offset, cursor)
+            self.result_cache.put(key, page)
+            return page
+
+        try:
+            return await self.single_flight.do(key, compute)
+        except HTTPException as e:
+            # While Qdrant is down, an expired copy beats an error
+            page = self.result_cache.get(key, stale=True) if e.status_code == 503 else None
+            if page is None:
+                raise
+            logger.warning(f"Serving stale search results: {e.detail}")
+            return page
+
+    async def _search(self, query: str, groups: List[str], items: List[str], 
+                    limit: int, offset: int, cursor: str = None) -> Tuple[List[dict], Optional[str]]:
         conditions = self.create_filter(groups, items)
+        kind = "search" if query else "scroll"
+        # Dense and hybrid rankings differ, so their cursors don't mix
+        hybrid = bool(query) and self.hybrid
+        fingerprint = request_fingerprint(normalize_query(query), canonical_filter(groups), canonical_filter(items), hybrid)
+        try:
+            token = decode_cursor(cursor, kind, fingerprint) if cursor else None
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {str(e)}")
+        local = self.local_index if self.local_index is not None and self.local_index.ready_for(self.collection_version) else None
+        local_filters = {"index_group_name": groups, "product_type_name": items}
         
         try:
-            logger.info(f"Searching with query: '{query}', filters: {conditions}, limit: {limit}, offset: {offset}")
+            if sampled():
+                logger.info(f"Performing {kind} with query: '{query}', groups: {groups}, items: {items}, limit: {limit}, offset: {offset}, cursor: {bool(cursor)}")
             
-            if not query:
-                logger.info("Performing scroll search (no query)")
-                results = self.client.scroll(
-                    collection_name=Config.COLLECTION_NAME,
-                    limit=limit,
-                    offset=offset,
-                    scroll_filter=conditions,
-                    with_payload=True,
-                    with_vectors=False
-                )[0]
+            if not query and local is not None and local.can_scroll():
+                with span("local"):
+                    results, next_offset = local.scroll(local_filters, limit, token["o"] if token else offset)
+                next_cursor = encode_cursor(kind, fingerprint, o=next_offset) if next_offset is not None else None
+            elif not query:
+                # A cursor resumes from Qdrant's next_page_offset instead of re-reading earlier pages
+                with span("qdrant"):
+                    results, next_offset = await self.client.scroll(
+                        collection_name=Config.COLLECTION_NAME,
+                        limit=limit,
+                        offset=token["o"] if token else offset,
+                        scroll_filter=conditions,
+                        with_payload=RESULT_PAYLOAD_FIELDS,
+                        with_vectors=False
+                    )
+                next_cursor = encode_cursor(kind, fingerprint, o=next_offset) if next_offset is not None else None
             else:
-                logger.info("Performing vector search")
-                # Generate embedding from text query using fastembed TextEmbedding
-                embeddings = list(self.encoder.embed([query]))
-                query_vector = embeddings[0].tolist()
-                logger.info(f"Generated embedding vector with dimension: {len(query_vector)}")
-                results = self.client.search(
-                    collection_name=Config.COLLECTION_NAME,
-                    query_vector=query_vector,
-                    limit=limit,
-                    offset=offset,
-                    query_filter=conditions,
-                    with_payload=True
-                )
+                # Generate embedding off the event loop, batched with concurrent queries
+                with span("embed"):
+                    query_vector, sparse_vector = await self.embed_query_vectors(query, hybrid)
+                # The local index only holds dense vectors
+                if local is not None and not hybrid:
+                    # Local ranking is exact and stable per version, so a cursor resumes at its position
+                    position = token["p"] if token else offset
+                    with span("local"):
+                        results = local.search(query_vector, local_filters, limit, position)
+                    position += len(results)
+                else:
+                    with span("qdrant"):
+                        if token:
+                            results, position = await self._search_after(query_vector, sparse_vector, conditions, fingerprint, token, limit)
+                        else:
+                            results = await self._query_vector_page(query_vector, sparse_vector, conditions, limit, offset)
+                            position = offset + len(results)
+                next_cursor = next_search_cursor(fingerprint, position, results, limit)
 
-            logger.info(f"Found {len(results)} results")
+            if sampled():
+                logger.info(f"Found {len(results)} results")
             
-            return [
-                SearchResult(
-                    image_url=hit.payload.get('image_url', ''),
-                    prod_name=hit.payload.get('prod_name', 'Unknown Product'),
-                    detail_desc=hit.payload.get('detail_desc', 'No description available'),
-                    product_type_name=hit.payload.get('product_type_name', ''),
-                    index_group_name=hit.payload.get('index_group_name', ''),
-                    price=float(hit.payload.get('price', 0.0)),
-                    article_id=hit.payload.get('article_id', ''),
-                    available=hit.payload.get('available', True),
-                    color=hit.payload.get('colour_group_name', ''),
-                    size=hit.payload.get('size', '')
-                ) 
-                for hit in results
-            ]
+            with span("serialize"):
+                return [
+                    to_search_result(hit) for hit in results
+                ], next_cursor
         except Exception as e:
             logger.error(f"Search error: {str(e)}")
             raise HTTPException(
-                status_code=500, 
+                status_code=error_status(e), 
                 detail=f"Search error: {str(e)}"
             )
 
-    async def get_groups(self) -> List[str]:
+    async def _search_after(self, query_vector: np.ndarray, sparse_vector: Optional[models.SparseVector],
+                            conditions: models.Filter, fingerprint: str, token: dict, limit: int) -> Tuple[list, int]:
+        """Page of vector hits after the cursor's last hit, cut from a growing window of hits."""
+        if token["p"] + limit > Config.SEARCH_WINDOW_MAX_DEPTH:
+            # Deeper than any window grows: page by offset without holding the hits
+            results = await self._query_vector_page(query_vector, sparse_vector, conditions, limit, token["p"])
+            return results, token["p"] + len(results)
+        
+        key = (self.collection_version, fingerprint)
+        window = self.search_windows.get(key)
+        if window is None:
+            window = SearchWindow(Config.SEARCH_WINDOW_MAX_DEPTH)
+            self.search_windows.put(key, window)
+        
+        async with window.lock:
+            # Grow the window until it holds a full page after the cursor's last hit
+            while True:
+                start = window.resume_index(token["p"], token["i"], token["s"])
+                if not window.covers(max(token["p"], start) + limit):
+                    break
+                fetch = window.fetch_size(max(token["p"], start) + limit)
+                if not fetch:
+                    break
+                hits = await self._query_vector_page(query_vector, sparse_vector, conditions, fetch, len(window.hits))
+                window.extend(hits, fetch)
+                self.search_windows.resize(key)
+        
+        if not window.covers(max(token["p"], start) + limit):
+            results = await self._query_vector_page(query_vector, sparse_vector, conditions, limit, start)
+            return results, start + len(results)
+        results = window.hits[start:start + limit]
+        return results, start + len(results)
+
+    async def _query_vector_page(self, query_vector: np.ndarray, sparse_vector: Optional[models.SparseVector],
+                                 conditions: models.Filter, limit: int, offset: int) -> list:
+        vector_query, prefetch = self.vector_query(query_vector, sparse_vector, conditions, offset + limit)
+        return (await self.client.query_points(
+            collection_name=Config.COLLECTION_NAME,
+            query=vector_query,
+            prefetch=prefetch,
+            limit=limit,
+            offset=offset,
+            query_filter=conditions,
+            search_params=SEARCH_PARAMS if prefetch is None else None,
+            with_payload=RESULT_PAYLOAD_FIELDS
+        )).points
+
+    async def search_batch(self, requests: List[SearchRequest]) -> List[List[dict]]:
+        """Run several searches with one batched embed call and one Qdrant batch query."""
         try:
-            logger.info("Fetching product groups")
-            groups = set()
-            offset = 0
-            limit = 100
+            # Concurrent embed_query calls land in the same scheduler batch
+            with span("embed"):
+                vectors = await asyncio.gather(*(
+                    self.embed_query_vectors(request.query, self.hybrid) for request in requests if request.query
+                ))
+            vectors = iter(vectors)
             
-            while True:
-                results = self.client.scroll(
+            query_requests = []
+            for request in requests:
+                conditions = self.create_filter(request.groups, request.items)
+                vector_query, prefetch = (
+                    self.vector_query(*next(vectors), conditions, request.offset + request.limit)
+                    if request.query else (None, None)
+                )
+                query_requests.append(models.QueryRequest(
+                    query=vector_query,
+                    prefetch=prefetch,
+                    filter=conditions,
+                    limit=request.limit,
+                    offset=request.offset,
+                    params=SEARCH_PARAMS if vector_query is not None and prefetch is None else None,
+                    with_payload=RESULT_PAYLOAD_FIELDS
+                ))
+            with span("qdrant"):
+                responses = await self.client.query_batch_points(
+                    collection_name=Config.COLLECTION_NAME,
+                    requests=query_requests
+                )
+            if sampled():
+                logger.info(f"Batch search ran {len(requests)} searches")
+            
+            with span("serialize"):
+                return [
+                    [to_search_result(hit) for hit in response.points]
+                    for response in responses
+                ]
+        except Exception as e:
+            logger.error(f"Batch search error: {str(e)}")
+            raise HTTPException(
+                status_code=error_status(e), 
+                detail=f"Batch search error: {str(e)}"
+            )
+
+    async def resolve_point_ids(self, article_ids: List[str]) -> dict:
+        """Map article IDs to Qdrant point IDs, looking up uncached ones in a single scroll."""
+        found = {}
+        missing = []
+        for article_id in article_ids:
+            point_id = self.point_ids.get(article_id)
+            if point_id is None:
+                missing.append(article_id)
+            else:
+                found[article_id] = point_id
+        
+        if missing:
+            points, _ = await self.client.scroll(
+                collection_name=Config.COLLECTION_NAME,
+                scroll_filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="article_id",
+                            match=models.MatchAny(any=missing)
+                        )
+                    ]
+                ),
+                limit=len(missing),
+                with_payload=["article_id"],
+                with_vectors=False
+            )
+            for point in points:
+                self.point_ids.put(point.payload["article_id"], point.id)
+                found[point.payload["article_id"]] = point.id
+        return found
+
+    async def similar(self, article_id: str, groups: List[str], items: List[str], limit: int, offset: int,
+                      positive: List[str] = None, negative: List[str] = None) -> List[dict]:
+        """Items similar to an article, using its stored vector instead of the text encoder."""
+        positive = [article_id] + [a for a in positive or [] if a != article_id]
+        negative = negative or []
+        try:
+            with span("lookup"):
+                point_ids = await self.resolve_point_ids(positive + negative)
+        except Exception as e:
+            logger.error(f"Failed to look up articles: {str(e)}")
+            raise HTTPException(status_code=error_status(e), detail=f"Failed to look up articles: {str(e)}")
+        
+        unknown = [a for a in positive + negative if a not in point_ids]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Unknown article_id: {', '.join(unknown)}")
+        
+        try:
+            # Qdrant excludes the example points themselves from the results
+            with span("qdrant"):
+                results = (await self.client.query_points(
                     collection_name=Config.COLLECTION_NAME,
+                    query=models.RecommendQuery(
+                        recommend=models.RecommendInput(
+                            positive=[point_ids[a] for a in positive],
+                            negative=[point_ids[a] for a in negative]
+                        )
+                    ),
+                    query_filter=self.create_filter(groups, items),
                     limit=limit,
                     offset=offset,
-                    with_payload=["index_group_name"]
-                )[0]
-                
-                if not results:
-                    break
-                    
-                groups.update(
-                    result.payload.get('index_group_name') 
-                    for result in results 
-                    if result.payload.get('index_group_name')
-                )
-                offset += limit
+                    search_params=SEARCH_PARAMS,
+                    with_payload=RESULT_PAYLOAD_FIELDS
+                )).points
+            with span("serialize"):
+                return [to_search_result(hit) for hit in results]
+        except Exception as e:
+            logger.error(f"Similar search error: {str(e)}")
+            raise HTTPException(
+                status_code=error_status(e), 
+                detail=f"Similar search error: {str(e)}"
+            )
+
+    async def export(self, groups: List[str], items: List[str], fields: List[str]) -> AsyncIterator[bytes]:
+        """Yield the filtered catalog as NDJSON, one chunk per scroll page.
+        
+        Only one page is held at a time, so memory stays flat however large the export.
+        """
+        conditions = self.create_filter(groups, items)
+        payload_keys = [RESULT_FIELD_KEYS.get(field, field) for field in fields]
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=Config.COLLECTION_NAME,
+                limit=Config.EXPORT_PAGE_SIZE,
+                offset=offset,
+                scroll_filter=conditions,
+                with_payload=payload_keys,
+                with_vectors=False
+            )
+            chunk = bytearray()
+            for point in points:
+                result = to_search_result(point)
+                chunk += orjson.dumps({field: result[field] for field in fields}, option=orjson.OPT_APPEND_NEWLINE)
+            yield bytes(chunk)
+            if offset is None:
+                break
 
-            ordered_groups = [g for g in Config.GROUP_ORDER if g in groups] + sorted(groups - set(Config.GROUP_ORDER))
-            logger.info(f"Found {len(ordered_groups)} product groups")
-            return ordered_groups
+    async def get_groups(self) -> List[str]:
+        try:
+            with span("facets"):
+                await self.facet_index.ensure_ready(self.client, Config.COLLECTION_NAME)
+                groups = set(self.facet_index.values("index_group_name"))
+            return [g for g in Config.GROUP_ORDER if g in groups] + sorted(groups - set(Config.GROUP_ORDER))
             
         except Exception as e:
             logger.error(f"Failed to fetch groups: {str(e)}")
             raise HTTPException(
-                status_code=500, 
+                status_code=error_status(e), 
                 detail=f"Failed to fetch groups: {str(e)}"
             )
 
+    async def get_facets(self, groups: List[str], items: List[str]) -> dict:
+        """Counts per value of each facet field, restricted by the current filters."""
+        try:
+            with span("facets"):
+                await self.facet_index.ensure_ready(self.client, Config.COLLECTION_NAME)
+                return self.facet_index.counts({
+                    "index_group_name": groups,
+                    "product_type_name": items
+                })
+            
+        except Exception as e:
+            logger.error(f"Failed to fetch facets: {str(e)}")
+            raise HTTPException(
+                status_code=error_status(e), 
+                detail=f"Failed to fetch facets: {str(e)}"
+            )
+
+    async def suggest(self, prefix: str, groups: List[str], items: List[str], limit: int) -> List[dict]:
+        """Typeahead suggestions for a partial query, ranked by frequency within the filters."""
+        try:
+            with span("suggest"):
+                await self.suggestions.ensure_ready(self.client, Config.COLLECTION_NAME)
+                return self.suggestions.suggest(normalize_query(prefix), limit, groups, items)
+            
+        except Exception as e:
+            logger.error(f"Failed to fetch suggestions: {str(e)}")
+            raise HTTPException(
+                status_code=error_status(e), 
+                detail=f"Failed to fetch suggestions: {str(e)}"
+            )
+
     async def get_featured_products(self, limit_per_category: int = 4) -> dict:
         """Get featured products from each category for the landing page."""
-        logger.info(f"Getting featured products, {limit_per_category} per category")
+        with span("snapshot"):
+            snapshot = self.featured.get(limit_per_category)
+        if snapshot is not None:
+            return snapshot
         
+        if sampled():
+            logger.info(f"Getting featured products, {limit_per_category} per category")
         try:
-            # Get all available categories
-            groups = await self.get_groups()
-            
-            result = {}
-            
-            # For each category, get a few items
-            for group in groups:
-                logger.info(f"Getting featured products for category: {group}")
-                
-                # Create a filter for this category
-                conditions = {
-                    "must": [
-                        {
-                            "key": "index_group_name",
-                            "match": {"value": group}
-                        }
-                    ]
-                }
-                
-                # Get some products from this category
-                category_results = self.client.scroll(
-                    collection_name=Config.COLLECTION_NAME,
-                    limit=limit_per_category,
-                    scroll_filter=conditions,
-                    with_payload=True,
-                    with_vectors=False
-                )[0]
-                
-                if category_results:
-                    # Convert to SearchResult objects
-                    result[group] = [
-                        SearchResult(
-                            image_url=hit.payload.get('image_url', ''),
-                            prod_name=hit.payload.get('prod_name', 'Unknown Product'),
-                            detail_desc=hit.payload.get('detail_desc', 'No description available'),
-                            product_type_name=hit.payload.get('product_type_name', ''),
-                            index_group_name=hit.payload.get('index_group_name', ''),
-                            price=float(hit.payload.get('price', 0.0)),
-                            article_id=hit.payload.get('article_id', ''),
-                            available=hit.payload.get('available', True),
-                            color=hit.payload.get('colour_group_name', ''),
-                            size=hit.payload.get('size', '')
-                        ) 
-                        for hit in category_results
-                    ]
-            
-            logger.info(f"Retrieved featured products for {len(result)} categories")
-            return result
+            return await self._fetch_featured_products(limit_per_category)
             
         except Exception as e:
             logger.error(f"Error getting featured products: {str(e)}")
             raise HTTPException(
-                status_code=500, 
+                status_code=error_status(e), 
                 detail=f"Error getting featured products: {str(e)}"
             )
 
+    async def refresh_featured(self):
+        """Rebuild the in-memory featured products snapshot."""
+        self.featured.set(await self._fetch_featured_products(self.featured.limit_per_category))
+        logger.info(f"Refreshed featured products snapshot for {len(self.featured.products)} categories")
+
+    async def _fetch_featured_products(self, limit_per_category: int) -> dict:
+        # Get all available categories
+        groups = await self.get_groups()
+        
+        # One batched request with a filtered sample per category instead of one scroll per category
+        with span("qdrant"):
+            responses = await self.client.query_batch_points(
+                collection_name=Config.COLLECTION_NAME,
+                requests=[
+                    models.QueryRequest(
+                        filter=models.Filter(
+                            must=[
+                                models.FieldCondition(
+                                    key="index_group_name",
+                                    match=models.MatchValue(value=group)
+                                )
+                            ]
+                        ),
+                        limit=limit_per_category,
+                        with_payload=RESULT_PAYLOAD_FIELDS
+                    )
+                    for group in groups
+                ]
+            )
+        
+        result = {}
+        with span("serialize"):
+            for group, response in zip(groups, responses):
+                if response.points:
+                    result[group] = [
+                        to_search_result(hit) for hit in response.points
+                    ]
+        
+        if sampled():
+            logger.info(f"Retrieved featured products for {len(result)} categories")
+        return result
+
+# Qdrant service, created on startup. Stays None if initialization fails so API calls return 503
+qdrant_service = None
+# Text encoder loaded before the app starts (see serve.py); workers forked afterwards share it copy-on-write
+preloaded_encoder = None
+# Thumbnail cache; independent of Qdrant, so images are served even while it is unavailable
+image_store = ImageStore(Config.IMAGE_CACHE_DIR, Config.IMAGE_DEFAULT_WIDTH)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the Qdrant service inside the event loop and close its client on shutdown.
+    
+    Startup does no network I/O or model loading, so the server accepts connections right
+    away; collection verification and encoder loading run in the background (see /ready).
+    """
+    global qdrant_service
+    try:
+        logger.info("Attempting to initialize Qdrant service...")
+        qdrant_service = QdrantService(encoder=preloaded_encoder)
+    except Exception as e:
+        error_msg = f"Failed to initialize Qdrant service: {str(e)}"
+        logger.error(error_msg)
+    
+    background_tasks = [asyncio.create_task(image_store.watch(Config.IMAGE_MAP_CHECK_SECONDS))]
+    if qdrant_service is not None:
+        start_background_tasks(qdrant_service, background_tasks)
+    else:
+        # Keep trying instead of answering 503 for the life of the process
+        background_tasks.append(asyncio.create_task(reconnect(background_tasks)))
+    
+    yield
+    
+    for task in background_tasks:
+        task.cancel()
+    if qdrant_service is not None:
+        await qdrant_service.close()
+        qdrant_service = None
+
+async def reconnect(background_tasks: list):
+    """Create the Qdrant service with backoff, then start its background work."""
+    global qdrant_service
+    delay = 1.0
+    while qdrant_service is None:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, Config.QDRANT_RECONNECT_MAX_SECONDS)
+        try:
+            qdrant_service = QdrantService(encoder=preloaded_encoder)
+        except Exception as e:
+            logger.error(f"Failed to initialize Qdrant service: {str(e)}")
+    logger.info("Initialized Qdrant service")
+    start_background_tasks(qdrant_service, background_tasks)
+
+def start_background_tasks(service: QdrantService, background_tasks: list):
+    warmup_queries = None
+    if Config.EMBED_CACHE_WARMUP_FILE:
+        with open(Config.EMBED_CACHE_WARMUP_FILE) as f:
+            warmup_queries = f.read().splitlines()
+    background_tasks.append(asyncio.create_task(service.warm_up(warmup_queries)))
+    background_tasks.append(asyncio.create_task(
+        service.watch_collection_version(Config.COLLECTION_VERSION_CHECK_SECONDS)
+    ))
+    
+    async def build_indexes():
+        # Once Qdrant is reachable (warm_up retries until it is)
+        await service.connected.wait()
+        for build in (service.facet_index.ensure_ready, service.suggestions.ensure_ready):
+            try:
+                await build(service.client, Config.COLLECTION_NAME)
+            except Exception as e:
+                logger.warning(f"Failed to build index at startup: {str(e)}")
+    
+    # Build the facet and suggest indexes without holding up startup, then keep facets fresh
+    background_tasks.append(asyncio.create_task(build_indexes()))
+    background_tasks.append(asyncio.create_task(
+        service.facet_index.refresh_periodically(
+            service.client, Config.COLLECTION_NAME, Config.FACET_REFRESH_SECONDS
+        )
+    ))
+    background_tasks.append(asyncio.create_task(
+        service.health.probe_periodically(service.health_checks, Config.HEALTH_PROBE_SECONDS)
+    ))
+    # A shipped snapshot file serves /featured immediately; otherwise build one right away
+    loaded = bool(Config.FEATURED_SNAPSHOT_FILE) and service.featured.load(Config.FEATURED_SNAPSHOT_FILE)
+    background_tasks.append(asyncio.create_task(
+        service.featured.refresh_periodically(
+            service.refresh_featured, Config.FEATURED_REFRESH_SECONDS, immediately=not loaded
+        )
+    ))
+
+def service_gauges() -> dict:
+    """Cache and queue gauges for /metrics, read from the live service."""
+    if qdrant_service is None:
+        return {"search_api_qdrant_available": 0}
+    return {
+        "search_api_qdrant_available": 1,
+        "search_api_qdrant_probe_ok": int(bool(qdrant_service.health.ok("qdrant"))),
+        "search_api_embedding_cache_hit_ratio": qdrant_service.embedding_cache.metrics()["hit_ratio"],
+        "search_api_embedding_cache_entries": qdrant_service.embedding_cache.metrics()["entries"],
+        "search_api_sparse_embedding_cache_hit_ratio": qdrant_service.sparse_cache.metrics()["hit_ratio"],
+        "search_api_embedding_queue_depth": qdrant_service.embedder.metrics()["queue_depth"],
+        "search_api_embedding_batches_in_flight": qdrant_service.embedder.metrics()["batches_in_flight"],
+        "search_api_result_cache_hit_ratio": qdrant_service.result_cache.metrics()["hit_ratio"],
+        "search_api_result_cache_entries": qdrant_service.result_cache.metrics()["entries"],
+        "search_api_point_id_cache_hit_ratio": qdrant_service.point_ids.metrics()["hit_ratio"],
+        "search_api_single_flight_in_flight": qdrant_service.single_flight.metrics()["in_flight"],
+        **resilience_gauges(qdrant_service),
+    }
+
+def resilience_gauges(service: QdrantService) -> dict:
+    if not isinstance(service.client, ResilientClient):
+        return {}
+    stats = service.client.metrics()
+    return {
+        "search_api_qdrant_circuit_open": int(stats["circuit"]["state"] != "closed"),
+        "search_api_qdrant_circuit_opens": stats["circuit"]["opens"],
+        "search_api_qdrant_retries": stats["retried"],
+        "search_api_qdrant_timeouts": stats["timeouts"],
+        "search_api_qdrant_failures": stats["failed"],
+        "search_api_qdrant_rejected": stats["rejected"],
+        "search_api_qdrant_hedged": stats["hedged"],
+        "search_api_result_cache_stale_hits": service.result_cache.metrics()["stale_hits"],
+    }
+
+metrics = Metrics()
+metrics.register_gauges(service_gauges)
+
 # Initialize FastAPI and services
-app = FastAPI(title="H&M Fashion Search API")
+app = FastAPI(title="H&M Fashion Search API", lifespan=lifespan)
 
-# Initialize Qdrant service
-try:
-    logger.info("Attempting to initialize Qdrant service...")
-    qdrant_service = QdrantService()
-    logger.info("Qdrant service initialized successfully")
-except Exception as e:
-    error_msg = f"Failed to initialize Qdrant service: {str(e)}"
-    logger.error(error_msg)
-    # We'll still define the variable to avoid NameError, but API calls will fail
-    qdrant_service = None
-
-# Configure CORS
+def catalog_version(path: str) -> Optional[str]:
+    """Version the catalog responses at `path` are computed from, read from memory only."""
+    if qdrant_service is None or qdrant_service.collection_version is None:
+        return None
+    if path.endswith("/featured") and qdrant_service.featured.digest is not None:
+        return f"{qdrant_service.collection_version}-{qdrant_service.featured.digest}"
+    return qdrant_service.collection_version
+
+# Conditional requests for catalog-level responses: 304s never reach the handlers
+@app.middleware("http")
+async def http_cache(request: Request, call_next):
+    path = request.url.path
+    if not Config.HTTP_CACHE_ENABLED or not is_cacheable(request.method, path, request.query_params):
+        return await call_next(request)
+    version = catalog_version(path)
+    if version is None:
+        return await call_next(request)
+
+    etag = make_etag(version, path, request.url.query)
+    control = cache_control(Config.HTTP_CACHE_MAX_AGE, Config.HTTP_CACHE_STALE_WHILE_REVALIDATE)
+    matched = match_etag(request.headers.get("if-none-match"), etag)
+    if matched is not None:
+        return Response(status_code=304, headers={"ETag": matched, "Cache-Control": control, "Vary": "Accept-Encoding"})
+
+    response = await call_next(request)
+    # Don't label a response computed against a version that changed mid-request
+    if response.status_code != 200 or catalog_version(path) != version:
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    gzipped = len(body) >= Config.GZIP_MIN_BYTES and accepts_gzip(request.headers.get("accept-encoding"))
+    if gzipped:
+        with span("compress"):
+            body = compress(body)
+    cached = Response(content=body, headers={k: v for k, v in response.headers.items() if k != "content-length"})
+    if gzipped:
+        cached.headers["Content-Encoding"] = "gzip"
+    cached.headers["ETag"] = gzip_etag(etag) if gzipped else etag
+    cached.headers["Cache-Control"] = control
+    cached.headers.add_vary_header("Accept-Encoding")
+    return cached
+
+# Everything else large (text searches, exports, metrics). Added after http_cache so it wraps it
+# and leaves the catalog responses, already gzipped under their own ETag, alone
+app.add_middleware(GZipMiddleware, minimum_size=Config.GZIP_MIN_BYTES)
+
+# Per-request timing: Server-Timing header and /metrics histograms
+@app.middleware("http")
+async def record_timing(request: Request, call_next):
+    spans = begin_request(Config.LOG_SAMPLE_RATE)
+    start_budget(endpoint_budget(request.url.path, Config.LATENCY_BUDGETS))
+    metrics.in_flight += 1
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["Server-Timing"] = server_timing(spans, time.perf_counter() - started)
+        return response
+    finally:
+        # Don't let the deadline outlive the request when the app runs in the caller's task (tests, ASGITransport)
+        start_budget(None)
+        metrics.in_flight -= 1
+        route = request.scope.get("route")
+        if route is not None:
+            endpoint = route.path
+        else:
+            # 304s from http_cache never reach the router; cacheable paths have no parameters
+            endpoint = request.url.path if status == 304 else "unmatched"
+        metrics.observe_request(endpoint, request.method, status, time.perf_counter() - started, spans)
+
+# Configure CORS. Added last so it wraps every middleware above, including the 304s from http_cache
 app.add_middleware(
     CORSMiddleware,
     allow_origins=Config.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing"],
 )
 
-# Root endpoint for health check
+# Root endpoint for health check: reports the last background probe, never calls Qdrant itself
 @app.get("/")
 async def root():
-    status = "ok" if qdrant_service is not None else "degraded"
-    return {
-        "status": status, 
+    healthy = qdrant_service is not None and qdrant_service.health.ok("qdrant") is not False
+    result = {
+        "status": "ok" if healthy else "degraded",
         "message": "H&M Fashion Search API is running",
         "qdrant_url": Config.QDRANT_URL,
         "collection": Config.COLLECTION_NAME
     }
+    if qdrant_service is not None:
+        health = qdrant_service.health
+        result["checks"] = {name: check["status"] for name, check in health.results.items()}
+        result["checked_at"] = health.checked_at
+        result["latency_ms"] = health.percentiles()
+    return result
+
+# Readiness endpoint: 200 once the collection is verified and the encoder is warm
+@app.get("/ready")
+async def ready():
+    if qdrant_service is None:
+        return json_response({"ready": False, "collection_verified": False, "encoder_loaded": False}, status_code=503)
+    checks = qdrant_service.readiness()
+    is_ready = all(checks.values())
+    return json_response({"ready": is_ready, **checks}, status_code=200 if is_ready else 503)
 
 # Search endpoint
 @app.get("/search", response_model=List[SearchResult])
@@ -285,9 +1161,14 @@ async def search_fashion_items(
     group: List[str] = Query(default=[]),
     item: List[str] = Query(default=[]),
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ):
-    """Search for fashion items using semantic search and/or filters."""
+    """Search for fashion items using semantic search and/or filters.
+    
+    The cursor for the next page is returned in the X-Next-Cursor header; pass it back
+    as `cursor` to keep a flat per-page cost on deep pages (`offset` is ignored then).
+    """
     if qdrant_service is None:
         raise HTTPException(status_code=503, detail="Qdrant service is not available")
         
@@ -295,9 +1176,96 @@ async def search_fashion_items(
     groups = [unquote(g.strip()) for g in group]
     items = [unquote(i.strip()) for i in item]
     
-    logger.info(f"Search request: query='{query}', groups={groups}, items={items}, limit={limit}, offset={offset}")
+    if sampled():
+        logger.info(f"Search request: query='{query}', groups={groups}, items={items}, limit={limit}, offset={offset}")
     
-    return await qdrant_service.search(query, groups, items, limit, offset)
+    results, next_cursor = await qdrant_service.search(query, groups, items, limit, offset, cursor)
+    return json_response(results, headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+# Batch search endpoint
+@app.post("/search/batch", response_model=List[List[SearchResult]])
+async def search_fashion_items_batch(requests: List[SearchRequest]):
+    """Run several searches in one call; results are returned in request order."""
+    if qdrant_service is None:
+        raise HTTPException(status_code=503, detail="Qdrant service is not available")
+    if len(requests) > Config.SEARCH_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large: {len(requests)} searches (max {Config.SEARCH_BATCH_MAX_SIZE})"
+        )
+    if not requests:
+        return []
+        
+    requests = [
+        SearchRequest(
+            query=unquote(request.query.strip()),
+            groups=[unquote(g.strip()) for g in request.groups],
+            items=[unquote(i.strip()) for i in request.items],
+            limit=request.limit,
+            offset=request.offset
+        )
+        for request in requests
+    ]
+    return json_response(await qdrant_service.search_batch(requests))
+
+# Similar items endpoint
+@app.get("/similar/{article_id}", response_model=List[SearchResult])
+async def similar_fashion_items(
+    article_id: str,
+    group: List[str] = Query(default=[]),
+    item: List[str] = Query(default=[]),
+    positive: List[str] = Query(default=[]),
+    negative: List[str] = Query(default=[]),
+    limit: int = 20,
+    offset: int = 0
+):
+    """Find items similar to an article ("more like this"), optionally steered by extra
+    positive/negative example article IDs."""
+    if qdrant_service is None:
+        raise HTTPException(status_code=503, detail="Qdrant service is not available")
+        
+    groups = [unquote(g.strip()) for g in group]
+    items = [unquote(i.strip()) for i in item]
+    return json_response(await qdrant_service.similar(
+        article_id.strip(), groups, items, limit, offset,
+        positive=[p.strip() for p in positive],
+        negative=[n.strip() for n in negative]
+    ))
+
+# Catalog export endpoint
+@app.get("/export")
+async def export_catalog(
+    group: List[str] = Query(default=[]),
+    item: List[str] = Query(default=[]),
+    field: List[str] = Query(default=[])
+):
+    """Stream every item matching the filters as NDJSON (one JSON object per line).
+    
+    `field` picks the SearchResult fields to include (all by default).
+    """
+    if qdrant_service is None:
+        raise HTTPException(status_code=503, detail="Qdrant service is not available")
+    fields = field or list(SearchResult.model_fields)
+    unknown = [f for f in fields if f not in SearchResult.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        
+    groups = [unquote(g.strip()) for g in group]
+    items = [unquote(i.strip()) for i in item]
+    pages = qdrant_service.export(groups, items, fields)
+    try:
+        # Fetch the first page up front so connection errors still get a proper status code
+        first_page = await pages.__anext__()
+    except Exception as e:
+        logger.error(f"Export error: {str(e)}")
+        raise HTTPException(status_code=error_status(e), detail=f"Export error: {str(e)}")
+
+    async def stream():
+        yield first_page
+        async for page in pages:
+            yield page
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 # Groups endpoint
 @app.get("/groups", response_model=List[str])
@@ -308,25 +1276,125 @@ async def get_groups():
         
     return await qdrant_service.get_groups()
 
+# Facets endpoint
+@app.get("/facets", response_model=dict)
+async def get_facets(
+    group: List[str] = Query(default=[]),
+    item: List[str] = Query(default=[])
+):
+    """Get counts per value of group, product type and colour, restricted by the current filters."""
+    if qdrant_service is None:
+        raise HTTPException(status_code=503, detail="Qdrant service is not available")
+        
+    groups = [unquote(g.strip()) for g in group]
+    items = [unquote(i.strip()) for i in item]
+    return await qdrant_service.get_facets(groups, items)
+
+# Typeahead endpoint
+@app.get("/suggest", response_model=List[dict])
+async def suggest(
+    prefix: str = "",
+    group: List[str] = Query(default=[]),
+    item: List[str] = Query(default=[]),
+    limit: int = 10
+):
+    """Suggestions for a partial query from the in-memory prefix index; never runs the embedder."""
+    if qdrant_service is None:
+        raise HTTPException(status_code=503, detail="Qdrant service is not available")
+        
+    groups = [unquote(g.strip()) for g in group]
+    items = [unquote(i.strip()) for i in item]
+    limit = max(0, min(limit, Config.SUGGEST_MAX_LIMIT))
+    return json_response(await qdrant_service.suggest(prefix, groups, items, limit))
+
+# Thumbnail endpoint: WebP files from the images.py cache, sent as file responses
+@app.get("/img/{article_id}")
+async def get_image(article_id: str, request: Request, w: Optional[int] = None, v: Optional[str] = None):
+    """Smallest thumbnail at least `w` pixels wide. URLs carrying the content digest
+    as `v` (as written to imageMap.json) never change content, so they are immutable."""
+    found = image_store.lookup(article_id, w)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"No thumbnail for article {article_id}")
+    path, digest = found
+    etag = f'"{digest}"'
+    max_age = 31536000 if v == digest else Config.IMAGE_CACHE_MAX_AGE
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}" + (", immutable" if v == digest else ""),
+    }
+    if match_etag(request.headers.get("if-none-match"), etag) is not None:
+        return Response(status_code=304, headers=headers)
+    # Served with sendfile (http.response.pathsend) where the server supports it
+    return FileResponse(path, media_type="image/webp", headers=headers)
+
 # Add API prefix endpoints for Next.js
 @app.get("/api/py/")
 async def api_root():
     return await root()
 
+@app.get("/api/py/ready")
+async def api_ready():
+    return await ready()
+
 @app.get("/api/py/search", response_model=List[SearchResult])
 async def api_search_fashion_items(
     query: str = "", 
     group: List[str] = Query(default=[]),
     item: List[str] = Query(default=[]),
     limit: int = 20,
+    offset: int = 0,
+    cursor: Optional[str] = None
+):
+    return await search_fashion_items(query, group, item, limit, offset, cursor)
+
+@app.post("/api/py/search/batch", response_model=List[List[SearchResult]])
+async def api_search_fashion_items_batch(requests: List[SearchRequest]):
+    return await search_fashion_items_batch(requests)
+
+@app.get("/api/py/similar/{article_id}", response_model=List[SearchResult])
+async def api_similar_fashion_items(
+    article_id: str,
+    group: List[str] = Query(default=[]),
+    item: List[str] = Query(default=[]),
+    positive: List[str] = Query(default=[]),
+    negative: List[str] = Query(default=[]),
+    limit: int = 20,
     offset: int = 0
 ):
-    return await search_fashion_items(query, group, item, limit, offset)
+    return await similar_fashion_items(article_id, group, item, positive, negative, limit, offset)
 
 @app.get("/api/py/groups", response_model=List[str])
 async def api_get_groups():
     return await get_groups()
 
+@app.get("/api/py/export")
+async def api_export_catalog(
+    group: List[str] = Query(default=[]),
+    item: List[str] = Query(default=[]),
+    field: List[str] = Query(default=[])
+):
+    return await export_catalog(group, item, field)
+
+@app.get("/api/py/facets", response_model=dict)
+async def api_get_facets(
+    group: List[str] = Query(default=[]),
+    item: List[str] = Query(default=[])
+):
+    return await get_facets(group, item)
+
+@app.get("/api/py/suggest", response_model=List[dict])
+async def api_suggest(
+    prefix: str = "",
+    group: List[str] = Query(default=[]),
+    item: List[str] = Query(default=[]),
+    limit: int = 10
+):
+    return await suggest(prefix, group, item, limit)
+
+@app.get("/api/py/img/{article_id}")
+async def api_get_image(article_id: str, request: Request, w: Optional[int] = None, v: Optional[str] = None):
+    return await get_image(article_id, request, w, v)
+
 # Add a diagnostic endpoint
 @app.get("/api/py/diagnostic")
 async def diagnostic():
@@ -338,6 +1406,9 @@ async def diagnostic():
         "qdrant_api_key_provided": bool(Config.QDRANT_API_KEY),
         "collection_name": Config.COLLECTION_NAME,
         "text_model": Config.TEXT_EMBEDDING_MODEL,
+        "encoder_backend": Config.ENCODER_BACKEND,
+        "encoder_threads": Config.ENCODER_THREADS,
+        "search_params": {"hnsw_ef": Config.SEARCH_HNSW_EF, "oversampling": Config.SEARCH_OVERSAMPLING},
         "environment_variables": {
             "QDRANT_URL": os.getenv("QDRANT_URL", "not set"),
             "QDRANT_API_KEY": "provided" if os.getenv("QDRANT_API_KEY") else "not set",
@@ -345,31 +1416,63 @@ async def diagnostic():
         }
     }
     
+    results["image_cache"] = image_store.metrics()
+    
     # Test Qdrant connection
     if qdrant_service is None:
         results["qdrant_service"] = "failed_to_initialize"
     else:
         results["qdrant_service"] = "initialized"
-        try:
-            # Try to get collection info
-            client = QdrantClient(
-                url=Config.QDRANT_URL,
-                api_key=Config.QDRANT_API_KEY if Config.QDRANT_API_KEY else None
-            )
-            collection_info = client.get_collection(Config.COLLECTION_NAME)
-            results["qdrant_connection"] = "ok"
-            results["collection_info"] = {
-                "status": "ok",
-                "vectors_count": collection_info.vectors_count,
-                "points_count": collection_info.points_count,
-                "vector_size": collection_info.config.params.vectors.size,
+        results["embedding_scheduler"] = qdrant_service.embedder.metrics()
+        results["embedding_cache"] = qdrant_service.embedding_cache.metrics()
+        results["hybrid_search"] = {
+            "active": qdrant_service.hybrid,
+            "sparse_model": Config.SPARSE_EMBEDDING_MODEL,
+            "sparse_vector": Config.SPARSE_VECTOR_NAME,
+            "sparse_encoder_loaded": qdrant_service.sparse_encoder is not None,
+            "sparse_embedding_scheduler": qdrant_service.sparse_embedder.metrics(),
+            "sparse_embedding_cache": qdrant_service.sparse_cache.metrics(),
+        }
+        results["result_cache"] = {
+            **qdrant_service.result_cache.metrics(),
+            **qdrant_service.single_flight.metrics(),
+            "collection_version": qdrant_service.collection_version,
+        }
+        results["search_windows"] = qdrant_service.search_windows.metrics()
+        results["facet_index"] = qdrant_service.facet_index.metrics()
+        results["suggest_index"] = qdrant_service.suggestions.metrics()
+        results["point_id_cache"] = qdrant_service.point_ids.metrics()
+        if isinstance(qdrant_service.client, ResilientClient):
+            results["qdrant_resilience"] = {
+                **qdrant_service.client.metrics(),
+                "latency_budgets_ms": {endpoint: seconds * 1000 for endpoint, seconds in Config.LATENCY_BUDGETS.items()},
             }
-        except Exception as e:
+        results["featured_snapshot"] = qdrant_service.featured.metrics()
+        if qdrant_service.local_index is not None:
+            results["local_index"] = qdrant_service.local_index.metrics()
+        # Connection and collection info come from the last background probe, not a live call
+        results["health"] = {**qdrant_service.health.metrics(), "interval_seconds": Config.HEALTH_PROBE_SECONDS}
+        probe = qdrant_service.health.results.get("qdrant")
+        if probe is None:
+            results["qdrant_connection"] = "not_probed_yet"
+        elif probe["status"] == "ok":
+            results["qdrant_connection"] = "ok"
+            results["collection_info"] = {"status": "ok", **probe["collection"]}
+        else:
             results["qdrant_connection"] = "error"
-            results["qdrant_error"] = str(e)
+            results["qdrant_error"] = probe["error"]
     
     return results 
 
+# Prometheus scrape endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/py/metrics", response_class=PlainTextResponse)
+async def api_get_metrics():
+    return await get_metrics()
+
 # Add a new endpoint for featured products
 @app.get("/featured", response_model=dict)
 async def get_featured_products(limit_per_category: int = 4):
@@ -377,7 +1480,7 @@ async def get_featured_products(limit_per_category: int = 4):
     if qdrant_service is None:
         raise HTTPException(status_code=503, detail="Qdrant service is not available")
         
-    return await qdrant_service.get_featured_products(limit_per_category)
+    return json_response(await qdrant_service.get_featured_products(limit_per_category))
 
 # Add API prefix endpoint for featured products
 @app.get("/api/py/featured", response_model=dict)
@@ -0,0 +1,131 @@
+"""
+Request timing and Prometheus metrics for the search API.
+
+Service code wraps each stage (embed, qdrant, serialize, ...) in `span(name)`.
+The timing middleware collects a request's spans into a Server-Timing header
+and records them, together with the end-to-end latency, into per-endpoint
+histograms that /metrics exposes in the Prometheus text format.
+"""
+
+import random
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("spans", default=None)
+_sampled: ContextVar[bool] = ContextVar("sampled", default=True)
+
+
+@contextmanager
+def span(name: str):
+    """Time a stage of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((name, time.perf_counter() - started))
+
+
+def sampled() -> bool:
+    """Whether verbose logging is enabled for the current request."""
+    return _sampled.get()
+
+
+def begin_request(log_sample_rate: float) -> List[Tuple[str, float]]:
+    spans = []
+    _spans.set(spans)
+    _sampled.set(random.random() < log_sample_rate)
+    return spans
+
+
+def server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing header value; repeated stages are summed."""
+    durations = defaultdict(float)
+    for name, seconds in spans:
+        durations[name] += seconds
+    durations["total"] = total
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in durations.items())
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.latency: Dict[str, Histogram] = defaultdict(Histogram)
+        self.stages: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.in_flight = 0
+        self._gauges: List[Callable[[], Dict[str, float]]] = []
+
+    def observe_request(self, endpoint: str, method: str, status: int, total: float, spans: List[Tuple[str, float]]):
+        self.requests[(endpoint, method, status)] += 1
+        self.latency[endpoint].observe(total)
+        for stage, seconds in spans:
+            self.stages[(endpoint, stage)].observe(seconds)
+
+    def register_gauges(self, collect: Callable[[], Dict[str, float]]):
+        """Add a callback returning {metric_name: value}, evaluated on every scrape."""
+        self._gauges.append(collect)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP search_api_requests_total Requests by endpoint, method and status.",
+            "# TYPE search_api_requests_total counter",
+        ]
+        for (endpoint, method, status), count in sorted(self.requests.items()):
+            lines.append(f'search_api_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+        lines += [
+            "# HELP search_api_request_duration_seconds End-to-end request latency by endpoint.",
+            "# TYPE search_api_request_duration_seconds histogram",
+        ]
+        for endpoint, histogram in sorted(self.latency.items()):
+            lines += _histogram_lines("search_api_request_duration_seconds", f'endpoint="{endpoint}"', histogram)
+
+        lines += [
+            "# HELP search_api_stage_duration_seconds Latency of each request stage by endpoint.",
+            "# TYPE search_api_stage_duration_seconds histogram",
+        ]
+        for (endpoint, stage), histogram in sorted(self.stages.items()):
+            lines += _histogram_lines("search_api_stage_duration_seconds", f'endpoint="{endpoint}",stage="{stage}"', histogram)
+
+        lines += [
+            "# HELP search_api_requests_in_flight Requests currently being handled.",
+            "# TYPE search_api_requests_in_flight gauge",
+            f"search_api_requests_in_flight {self.in_flight}",
+        ]
+        for collect in self._gauges:
+            for name, value in collect().items():
+                lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
@@ -0,0 +1,161 @@
+"""
+Opaque continuation tokens for deep pagination.
+
+A cursor is URL-safe base64 of a small JSON document bound to the request it
+was issued for (query and filters, via a short fingerprint):
+
+- scroll cursors wrap Qdrant's next_page_offset, so the next page starts where
+  the previous one ended;
+- vector search cursors carry the position, score and point ID of the last
+  hit ("search-after"). Pages are cut from a per-request window of hits that
+  grows geometrically, so walking N pages costs O(N) results in total instead
+  of re-materializing every earlier page.
+
+Windows live in a WindowCache bounded by the total number of hits held, and
+a window never grows past its maximum depth; pages beyond it are fetched
+by offset. Windows are per process, so with several workers a next page
+only reuses a window when it lands on the worker that built it.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Short stable hash of the request a cursor belongs to."""
+    return hashlib.sha1(json.dumps(parts, separators=(",", ":")).encode()).hexdigest()[:12]
+
+
+def encode_cursor(kind: str, fingerprint: str, **state: Any) -> str:
+    document = {"k": kind, "f": fingerprint, **state}
+    raw = json.dumps(document, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str, kind: str, fingerprint: str) -> dict:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        document = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(document, dict) or document.get("k") != kind:
+        raise InvalidCursor("Cursor does not belong to this kind of search")
+    if document.get("f") != fingerprint:
+        raise InvalidCursor("Cursor does not belong to this query and filters")
+    return document
+
+
+class SearchWindow:
+    """Hits of one vector search request fetched so far, in rank order."""
+
+    def __init__(self, max_depth: int = 1000):
+        self.max_depth = max_depth
+        self.hits: List[Any] = []
+        self.exhausted = False
+        # Pages of the same request fetched concurrently must not extend the window twice
+        self.lock = asyncio.Lock()
+
+    def covers(self, needed: int) -> bool:
+        """Whether the window can hold `needed` hits without growing past its maximum depth."""
+        return needed <= self.max_depth
+
+    def fetch_size(self, needed: int) -> int:
+        """How many more hits to fetch so the window holds `needed`, doubling each time."""
+        if self.exhausted or len(self.hits) >= needed:
+            return 0
+        return min(max(needed, 2 * len(self.hits)), max(needed, self.max_depth)) - len(self.hits)
+
+    def extend(self, hits: List[Any], requested: int):
+        self.hits.extend(hits)
+        if len(hits) < requested:
+            self.exhausted = True
+
+    def resume_index(self, position: int, last_id: Any, last_score: float) -> int:
+        """Index of the first hit after the cursor's last hit."""
+        if 0 < position <= len(self.hits) and self.hits[position - 1].id == last_id:
+            return position
+        # The window was rebuilt (e.g. evicted); find the last hit by ID, then by score
+        for index, hit in enumerate(self.hits):
+            if hit.id == last_id:
+                return index + 1
+        for index, hit in enumerate(self.hits):
+            if hit.score < last_score:
+                return index
+        return len(self.hits)
+
+
+class WindowCache:
+    """LRU cache of search windows bounded by the total number of hits they hold, plus a TTL."""
+
+    def __init__(self, max_hits: int = 50000, ttl_seconds: float = 300):
+        self.max_hits = max_hits
+        self.ttl = ttl_seconds
+        self._windows: "OrderedDict[Hashable, Tuple[SearchWindow, float]]" = OrderedDict()
+        self._sizes: dict = {}
+        self.held = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[SearchWindow]:
+        entry = self._windows.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            self.misses += 1
+            return None
+        self._windows.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, window: SearchWindow):
+        self._windows[key] = (window, time.monotonic() + self.ttl)
+        self._windows.move_to_end(key)
+        self.resize(key)
+
+    def resize(self, key: Hashable):
+        """Account for a window that grew, evicting the least recently used ones over the bound."""
+        entry = self._windows.get(key)
+        if entry is not None:
+            self.held += len(entry[0].hits) - self._sizes.get(key, 0)
+            self._sizes[key] = len(entry[0].hits)
+        # Always keep the newest window, even if it alone is over the bound
+        while self.held > self.max_hits and len(self._windows) > 1:
+            evicted, _ = self._windows.popitem(last=False)
+            self.held -= self._sizes.pop(evicted, 0)
+            self.evictions += 1
+
+    def clear(self):
+        self._windows.clear()
+        self._sizes.clear()
+        self.held = 0
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "windows": len(self._windows),
+            "hits_held": self.held,
+            "max_hits": self.max_hits,
+            "lookups_hit": self.hits,
+            "lookups_missed": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def next_search_cursor(fingerprint: str, position: int, hits: List[Any], limit: int) -> Optional[str]:
+    """Cursor for the page after `hits`, which ends at `position`; None on a short (last) page."""
+    if not hits or len(hits) < limit:
+        return None
+    last = hits[-1]
+    return encode_cursor("search", fingerprint, p=position, s=last.score, i=last.id)
@@ -0,0 +1,286 @@
+"""
+Resilient access to Qdrant for the search API.
+
+ResilientClient wraps the async Qdrant client. Every read call gets:
+
+- a timeout: the per-call limit, capped by what is left of the request's
+  latency budget (set per endpoint by the timing middleware), so a hung call
+  fails while there is still time for a useful response instead of holding
+  the request until the client's own timeout;
+- bounded retries of transient failures (timeouts, connection errors, 429 and
+  5xx responses) with full-jitter exponential backoff, while the budget lasts;
+- optionally a hedged duplicate: once a call has run longer than the recent
+  p95 of that method, the same read is sent again and the first answer wins;
+- a circuit breaker: after a run of consecutive transient failures, calls fail
+  fast for a cooldown, then a single probe call decides whether to close it.
+
+Failures surface as QdrantUnavailable, which the API maps to 503 (and serves
+stale cached results for where it has them). The API only ever reads from
+Qdrant, so every wrapped call is safe to retry or duplicate.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import httpx
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+logger = logging.getLogger(__name__)
+
+# Client methods that only read, and so may be retried and hedged
+READ_METHODS = {
+    "get_collection", "get_collections", "collection_exists", "count", "scroll", "retrieve",
+    "query_points", "query_batch_points", "query_points_groups", "facet",
+}
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class QdrantUnavailable(Exception):
+    """Qdrant failed, was too slow for the latency budget, or the circuit is open."""
+
+
+def parse_budgets(spec: str) -> Dict[str, float]:
+    """Parse "search=2500,similar=2500" (milliseconds per endpoint) into seconds per endpoint."""
+    budgets = {}
+    for entry in spec.split(","):
+        if entry.strip():
+            endpoint, _, ms = entry.partition("=")
+            budgets[endpoint.strip().strip("/")] = float(ms) / 1000
+    return budgets
+
+
+def endpoint_budget(path: str, budgets: Dict[str, float]) -> Optional[float]:
+    """Budget for a request path: /api/py/search/batch -> "search/batch", /similar/123 -> "similar"."""
+    if path.startswith("/api/py/"):
+        path = path[len("/api/py"):]
+    parts = path.strip("/").split("/")
+    return budgets.get("/".join(parts[:2]), budgets.get(parts[0]))
+
+
+def start_budget(seconds: Optional[float]):
+    """Start the latency budget of the current request (None: no budget)."""
+    _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def remaining_budget() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def is_transient(e: Exception) -> bool:
+    if isinstance(e, UnexpectedResponse):
+        return e.status_code is None or e.status_code == 429 or e.status_code >= 500
+    return isinstance(e, (asyncio.TimeoutError, ConnectionError, OSError, httpx.TransportError, ResponseHandlingException))
+
+
+class LatencyWindow:
+    """Latencies of the last `size` successful calls of one method."""
+
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        if len(self.samples) < max(min_samples, 1):
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def p95(self, min_samples: int) -> Optional[float]:
+        return self.percentile(0.95, min_samples)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            # One probe call at a time decides whether Qdrant is back
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        """A call that took the probe slot ended without reaching Qdrant."""
+        self._probing = False
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info("Qdrant circuit closed")
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            if self.state == "closed":
+                logger.warning(f"Qdrant circuit opened after {self.failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.opens += 1
+
+    def metrics(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+        }
+
+
+class ResilientClient:
+    """Wraps an async Qdrant client; see the module docstring."""
+
+    def __init__(self, client, call_timeout: float = 3.0, retries: int = 2, backoff_base: float = 0.05,
+                 backoff_max: float = 1.0, hedge: bool = False, hedge_min_samples: int = 50,
+                 breaker: CircuitBreaker = None):
+        self._client = client
+        self.call_timeout = call_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latency: Dict[str, LatencyWindow] = defaultdict(LatencyWindow)
+        self.calls = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in READ_METHODS:
+            return attr
+
+        async def call(*args, **kwargs):
+            return await self._call(name, attr, args, kwargs)
+
+        return call
+
+    async def _call(self, name: str, method, args, kwargs):
+        self.calls += 1
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise QdrantUnavailable(f"Qdrant circuit is open, not calling {name}")
+            remaining = remaining_budget()
+            timeout = self.call_timeout if remaining is None else min(self.call_timeout, remaining)
+            if timeout <= 0:
+                self.breaker.release_probe()
+                raise QdrantUnavailable(f"Latency budget exhausted before Qdrant {name}")
+
+            started = time.monotonic()
+            try:
+                result = await self._attempt(name, method, args, kwargs, timeout)
+            except asyncio.CancelledError:
+                # The request went away mid-call
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    # Qdrant answered (e.g. 404), so it is reachable
+                    self.breaker.record_success()
+                    raise
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                self.breaker.record_failure()
+                attempt += 1
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                remaining = remaining_budget()
+                if attempt > self.retries or (remaining is not None and remaining <= delay):
+                    self.failed += 1
+                    raise QdrantUnavailable(f"Qdrant {name} failed after {attempt} attempt(s): {describe(e)}") from e
+                self.retried += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self.latency[name].observe(time.monotonic() - started)
+            return result
+
+    async def _attempt(self, name: str, method, args, kwargs, timeout: float):
+        hedge_after = self.latency[name].p95(self.hedge_min_samples) if self.hedge else None
+        if hedge_after is None or hedge_after >= timeout:
+            return await asyncio.wait_for(method(*args, **kwargs), timeout)
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(method(*args, **kwargs))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                # Slower than 95% of recent calls: race a duplicate read against it
+                self.hedged += 1
+                tasks.append(asyncio.ensure_future(method(*args, **kwargs)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                left = timeout - (time.monotonic() - started)
+                done, pending = await asyncio.wait(pending, timeout=max(left, 0), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def metrics(self) -> dict:
+        return {
+            "circuit": self.breaker.metrics(),
+            "calls": self.calls,
+            "retried": self.retried,
+            "timeouts": self.timeouts,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "hedge_enabled": self.hedge,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "call_timeout_seconds": self.call_timeout,
+            "p95_ms": {
+                name: round(p95 * 1000, 2)
+                for name, window in self.latency.items()
+                for p95 in [window.p95(1)] if p95 is not None
+            },
+        }
+
+
+def describe(e: Exception) -> str:
+    if isinstance(e, asyncio.TimeoutError):
+        return "timed out"
+    if isinstance(e, ResponseHandlingException):
+        return str(e.source) or type(e.source).__name__
+    return str(e) or type(e).__name__
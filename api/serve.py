@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Production entry point: load the query encoder once, then fork the workers.
+
+`uvicorn main:app --workers N` imports the app and loads the CLIP text model
+separately in every worker, so memory grows by a full model per worker and
+every worker pays the load again. Here the parent process loads and warms
+the encoder and binds the listening socket. It then forks N workers that run
+uvicorn on the shared socket. The model weights stay in pages shared
+copy-on-write, and each worker still creates its own Qdrant client and
+caches inside its own event loop.
+
+    python api/serve.py --workers 4 --port 8000
+
+ONNX Runtime thread pools don't survive fork(), so the preloaded encoder runs
+single-threaded (ENCODER_THREADS=1): scale with workers, one per core.
+Crashed workers are restarted. SIGTERM/SIGINT stops all of them.
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+logger = logging.getLogger("serve")
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app_module, sock: socket.socket, args):
+    import uvicorn
+
+    # Drop the parent's handlers; uvicorn installs its own for graceful shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app_module.app, log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(app_module, sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app_module, sock, args)
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")), help="Port to bind (defaults to $PORT)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+                        help="Worker processes (defaults to $WEB_CONCURRENCY, then the CPU count)")
+    parser.add_argument("--backlog", type=int, default=2048, help="Listen backlog of the shared socket")
+    parser.add_argument("--keep-alive", type=int, default=5, help="HTTP keep-alive timeout in seconds")
+    parser.add_argument("--log-level", default="info", help="uvicorn log level")
+    parser.add_argument("--no-preload", action="store_true", help="Let each worker load its own encoder")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    # Must be set before main.Config reads the environment
+    os.environ.setdefault("ENCODER_THREADS", "1")
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import main as app_module
+
+    if not args.no_preload:
+        if app_module.Config.ENCODER_THREADS != 1:
+            logger.warning("ENCODER_THREADS != 1: ONNX Runtime thread pools are not fork-safe, forcing 1 for the preloaded encoder")
+            app_module.Config.ENCODER_THREADS = 1
+        started = time.perf_counter()
+        app_module.preloaded_encoder = app_module.load_text_encoder()
+        logger.info(f"Preloaded encoder in {time.perf_counter() - started:.2f}s")
+        # Move everything loaded so far out of the GC's reach, so collections in the
+        # workers don't write to (and un-share) the preloaded pages
+        gc.freeze()
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    workers = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(args.workers):
+        workers[spawn(app_module, sock, args)] = time.monotonic()
+    logger.info(f"Serving on {args.host}:{args.port} with {args.workers} workers (pids {sorted(workers)})")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        logger.warning(f"Worker {pid} exited with status {status}, restarting")
+        # Don't spin if a worker dies right after starting
+        if time.monotonic() - started < 1:
+            time.sleep(1)
+        workers[spawn(app_module, sock, args)] = time.monotonic()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+In-memory typeahead index for the search box.
+
+Built with one streaming scroll over the collection (suggestion fields only).
+Every distinct product name, product type and colour becomes a suggestion,
+counted per (index group, product type) combination so counts can be
+restricted by the current filters. Lookups bisect a sorted array of keys:
+the suggestion itself plus every word-start suffix, so "top" finds
+"Strap top". The embedder and Qdrant are never touched on a keystroke.
+
+Candidates are visited in descending overall frequency and the scan stops
+once no remaining suggestion can beat the current top results. For one- and
+two-character prefixes (the widest ranges) the ranked candidates and the
+unfiltered results are precomputed.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_FIELDS = ["prod_name", "product_type_name", "colour_group_name"]
+FILTER_FIELDS = ["index_group_name", "product_type_name"]
+# Candidate rankings and unfiltered results are precomputed for prefixes up to this length
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+
+class SuggestIndex:
+    def __init__(self, fields: List[str] = SUGGEST_FIELDS, max_limit: int = 20):
+        self.fields = list(fields)
+        self.max_limit = max_limit
+        self._keys: List[str] = []
+        self._key_terms = np.zeros(0, dtype=np.int32)
+        # One entry per suggestion, in text order: (text, field, total count, counts per (group, product type))
+        self._terms: List[Tuple[str, str, int, Counter]] = []
+        self._totals = np.zeros(0, dtype=np.int64)
+        self._ranked: Dict[str, np.ndarray] = {}
+        self._precomputed: Dict[str, List[dict]] = {}
+        self._lock = asyncio.Lock()
+        self.built_at = None
+        self.build_seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    async def refresh(self, client, collection_name: str):
+        """Rebuild the index and swap it in atomically."""
+        async with self._lock:
+            await self._build(client, collection_name)
+
+    async def ensure_ready(self, client, collection_name: str):
+        if not self.ready:
+            async with self._lock:
+                if not self.ready:
+                    await self._build(client, collection_name)
+
+    async def _build(self, client, collection_name: str, page_size: int = 1000):
+        started = time.perf_counter()
+        counts: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+        payload_fields = list(dict.fromkeys(self.fields + FILTER_FIELDS))
+        offset = None
+        while True:
+            points, offset = await client.scroll(
+                collection_name=collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=payload_fields,
+                with_vectors=False
+            )
+            for point in points:
+                combo = tuple(point.payload.get(field) for field in FILTER_FIELDS)
+                for field in self.fields:
+                    text = " ".join(str(point.payload.get(field) or "").split())
+                    if text:
+                        counts[(text, field)][combo] += 1
+            if offset is None:
+                break
+
+        # Term IDs in text order, so ties in frequency rank alphabetically
+        terms = sorted(
+            (text, field, sum(combos.values()), combos) for (text, field), combos in counts.items()
+        )
+        entries = []
+        for term_id, (text, _, _, _) in enumerate(terms):
+            words = text.casefold().split()
+            for start in range(len(words)):
+                entries.append((" ".join(words[start:]), term_id))
+        entries.sort()
+
+        # Rank into a staged index: rankings cached on self still hold the old term IDs
+        staged = SuggestIndex(self.fields, self.max_limit)
+        staged._terms = terms
+        staged._totals = np.array([total for _, _, total, _ in terms], dtype=np.int64)
+        staged._keys = [key for key, _ in entries]
+        staged._key_terms = np.array([term_id for _, term_id in entries], dtype=np.int32)
+        short_prefixes = {key[:length] for key in staged._keys for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1)}
+        staged._ranked = {prefix: staged._rank(prefix) for prefix in short_prefixes}
+        staged._precomputed = {prefix: staged._lookup(prefix, self.max_limit, None, None) for prefix in short_prefixes}
+
+        self._terms, self._totals, self._keys, self._key_terms, self._ranked, self._precomputed = (
+            staged._terms, staged._totals, staged._keys, staged._key_terms, staged._ranked, staged._precomputed
+        )
+        self.built_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+        logger.info(f"Built suggest index: {len(terms)} suggestions, {len(entries)} keys in {self.build_seconds:.2f}s")
+
+    def _count(self, term_id: int, groups: Optional[set], items: Optional[set]) -> int:
+        _, _, total, combos = self._terms[term_id]
+        if groups is None and items is None:
+            return total
+        return sum(
+            count for (group, item), count in combos.items()
+            if (groups is None or group in groups) and (items is None or item in items)
+        )
+
+    def suggest(self, prefix: str, limit: int = 10, groups: List[str] = None, items: List[str] = None) -> List[dict]:
+        """Most frequent suggestions with a word starting with `prefix` (already normalized)."""
+        if not prefix or not self.ready:
+            return []
+        groups = set(groups) if groups else None
+        items = set(items) if items else None
+        if groups is None and items is None and prefix in self._precomputed and limit <= self.max_limit:
+            return self._precomputed[prefix][:limit]
+        return self._lookup(prefix, limit, groups, items)
+
+    def _rank(self, prefix: str) -> np.ndarray:
+        """IDs of the suggestions matching `prefix`, most frequent first."""
+        if prefix in self._ranked:
+            return self._ranked[prefix]
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\uffff", lo)
+        candidates = np.unique(self._key_terms[lo:hi])
+        # Stable, so ties stay in text order
+        return candidates[np.argsort(-self._totals[candidates], kind="stable")]
+
+    def _lookup(self, prefix: str, limit: int, groups: Optional[set], items: Optional[set]) -> List[dict]:
+        candidates = self._rank(prefix)
+        if not len(candidates) or limit <= 0:
+            return []
+
+        best = []  # min-heap of (count, -term_id)
+        for term_id in candidates.tolist():
+            if len(best) == limit and self._totals[term_id] <= best[0][0]:
+                # Filtered counts never exceed the total, so nothing further can rank higher
+                break
+            count = self._count(term_id, groups, items)
+            if count and (len(best) < limit or (count, -term_id) > best[0]):
+                heapq.heappush(best, (count, -term_id))
+                if len(best) > limit:
+                    heapq.heappop(best)
+
+        return [
+            {"text": self._terms[-neg_id][0], "field": self._terms[-neg_id][1], "count": count}
+            for count, neg_id in sorted(best, reverse=True)
+        ]
+
+    def metrics(self) -> dict:
+        return {
+            "ready": self.ready,
+            "suggestions": len(self._terms),
+            "keys": len(self._keys),
+            "built_at": self.built_at,
+            "build_seconds": round(self.build_seconds, 3) if self.build_seconds is not None else None,
+        }
@@ -0,0 +1,32 @@
+import os
+import sys
+
+# The API modules import each other as top-level modules, and the repo root has its own main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from qdrant_client import QdrantClient
+
+import main
+from benchmark import FakeEncoder, FaultyClient, seed_collection
+
+POINTS = 50
+
+
+@pytest.fixture(scope="session")
+def collection():
+    """Synthetic in-memory collection shared by every test."""
+    client = QdrantClient(":memory:")
+    seed_collection(client, POINTS)
+    return client
+
+
+@pytest.fixture
+def service(collection):
+    """QdrantService over the collection through a FaultyClient with no faults configured yet."""
+    faulty = FaultyClient(collection, latency=0.001)
+    service = main.QdrantService(client=faulty, encoder=FakeEncoder())
+    yield service, faulty
+    # The in-memory collection is shared, so only stop the encoder threads
+    service.embedder.close()
+    main.qdrant_service = None
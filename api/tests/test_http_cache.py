@@ -0,0 +1,33 @@
+"""Conditional requests on catalog responses, through the full middleware stack."""
+
+import asyncio
+
+import httpx
+
+import main
+from main import Config
+
+
+def test_cross_origin_revalidation_keeps_cors_headers(service):
+    service, _ = service
+    main.qdrant_service = service
+    origin = Config.CORS_ORIGINS[0]
+
+    async def scenario():
+        await service.refresh_collection_version()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            params = {"group": Config.GROUP_ORDER[0], "limit": 5}
+            first = await http.get("/api/py/search", params=params, headers={"Origin": origin})
+            revalidated = await http.get(
+                "/api/py/search", params=params,
+                headers={"Origin": origin, "If-None-Match": first.headers["ETag"]}
+            )
+            return first, revalidated
+
+    first, revalidated = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert revalidated.status_code == 304
+    assert revalidated.headers["Access-Control-Allow-Origin"] == origin
+    assert "Origin" in revalidated.headers["Vary"]
+    assert revalidated.headers["ETag"] == first.headers["ETag"]
@@ -0,0 +1,161 @@
+"""
+Resilience layer against the fault-injecting stand-in from benchmark.py.
+
+Run with `python -m pytest api/tests`. No Qdrant server or model is needed:
+calls go to an in-memory collection through FaultyClient.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+import resilience
+from benchmark import FaultyClient
+from cache import ResultCache
+from conftest import POINTS
+from main import Config, error_status
+from resilience import CircuitBreaker, QdrantUnavailable, ResilientClient
+
+
+class Rolls:
+    """Replaces FaultyClient's random source with fixed rolls."""
+
+    def __init__(self, *values):
+        self.values = list(values)
+
+    def random(self):
+        return self.values.pop(0)
+
+
+def count(client):
+    return client.count(Config.COLLECTION_NAME)
+
+
+def test_transient_errors_are_retried_a_bounded_number_of_times(collection):
+    faulty = FaultyClient(collection, latency=0.001, error_rate=1.0)
+    client = ResilientClient(faulty, retries=2, backoff_base=0.001, breaker=CircuitBreaker(failure_threshold=100))
+
+    with pytest.raises(QdrantUnavailable, match="after 3 attempt"):
+        asyncio.run(count(client))
+
+    assert faulty.injected["errors"] == 3
+    assert client.retried == 2
+    assert client.failed == 1
+
+
+def test_retry_recovers_from_a_transient_error(collection):
+    faulty = FaultyClient(collection, latency=0.001, error_rate=0.5)
+    faulty._rng = Rolls(0.1, 0.9)
+    client = ResilientClient(faulty, retries=2, backoff_base=0.001)
+
+    assert asyncio.run(count(client)).count == POINTS
+    assert faulty.injected["errors"] == 1
+    assert client.retried == 1
+    assert client.failed == 0
+    assert client.breaker.state == "closed"
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_reset(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] += 9.9
+    assert not breaker.allow()
+    now[0] += 0.1
+    # Exactly one probe call goes through once the cooldown is over
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+    # A failed probe reopens the circuit for another cooldown
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.opens == 2
+    now[0] += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_open_circuit_fails_fast_without_calling_qdrant(collection):
+    faulty = FaultyClient(collection, latency=0.001, outage_start=0, outage_seconds=60)
+    client = ResilientClient(faulty, retries=0, breaker=CircuitBreaker(failure_threshold=3, reset_seconds=60))
+
+    for _ in range(3):
+        with pytest.raises(QdrantUnavailable):
+            asyncio.run(count(client))
+    assert client.breaker.state == "open"
+
+    with pytest.raises(QdrantUnavailable, match="circuit is open"):
+        asyncio.run(count(client))
+    assert faulty.injected["outage"] == 3
+    assert client.rejected == 1
+
+
+def test_qdrant_unavailable_maps_to_503(service):
+    service, faulty = service
+    main.qdrant_service = service
+    faulty._outage = (0, float("inf"))
+    assert error_status(QdrantUnavailable("down")) == 503
+    assert error_status(ValueError("bug")) == 500
+
+    async def get():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get("/api/py/search", params={"query": "black dress", "limit": 5})
+
+    assert asyncio.run(get()).status_code == 503
+
+
+def test_search_serves_stale_page_while_circuit_is_open(service):
+    service, faulty = service
+    service.result_cache = ResultCache(ttl_seconds=0.01)
+
+    async def scenario():
+        fresh = await service.search("black dress", [], [], 5, 0)
+        await asyncio.sleep(0.02)
+        for _ in range(service.client.breaker.failure_threshold):
+            service.client.breaker.record_failure()
+        calls = faulty.injected.copy(), service.client.calls
+        stale = await service.search("black dress", [], [], 5, 0)
+        return fresh, stale, calls
+
+    fresh, stale, (injected, calls) = asyncio.run(scenario())
+    assert service.client.breaker.state == "open"
+    assert stale == fresh and len(fresh[0]) == 5
+    assert service.result_cache.metrics()["stale_hits"] == 1
+    assert service.client.rejected == 1
+    assert faulty.injected == injected
+
+
+def test_slow_primary_is_hedged_and_hedge_wins(collection):
+    faulty = FaultyClient(collection, latency=0.001, slow_rate=0.5, slow_latency=1.0)
+    faulty._rng = Rolls(*[0.9] * 10)
+    client = ResilientClient(faulty, call_timeout=3.0, hedge=True, hedge_min_samples=10)
+
+    async def scenario():
+        # Latency history for the p95 that triggers the hedge
+        for _ in range(10):
+            await count(client)
+        faulty._rng = Rolls(0.1, 0.9)
+        started = time.monotonic()
+        result = await count(client)
+        return result, time.monotonic() - started
+
+    result, seconds = asyncio.run(scenario())
+    assert result.count == POINTS
+    assert client.hedged == 1
+    assert client.hedge_wins == 1
+    assert faulty.injected["slow"] == 1
+    assert seconds < 0.5
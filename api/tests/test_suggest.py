@@ -0,0 +1,36 @@
+"""Typeahead index rebuilds, against a stand-in client that scrolls fixed payloads."""
+
+import asyncio
+from types import SimpleNamespace
+
+from suggest import SuggestIndex
+
+
+class ScrollClient:
+    def __init__(self, payloads):
+        self.payloads = payloads
+
+    async def scroll(self, collection_name, limit, offset, with_payload, with_vectors):
+        return [SimpleNamespace(payload=payload) for payload in self.payloads], None
+
+
+def article(name, product_type="Dress", colour="Black", group="Ladieswear"):
+    return {"prod_name": name, "product_type_name": product_type, "colour_group_name": colour, "index_group_name": group}
+
+
+def test_refresh_on_a_smaller_catalog_replaces_every_ranking():
+    index = SuggestIndex()
+
+    async def scenario():
+        # Names sorting before "Black" and "Dress" push their term IDs past the smaller catalog's
+        await index.refresh(ScrollClient([article(f"Alpha {i}") for i in range(50)]), "articles")
+        await index.refresh(ScrollClient([article("Strap dress")]), "articles")
+
+    asyncio.run(scenario())
+    assert index.suggest("d") == [
+        {"text": "Dress", "field": "product_type_name", "count": 1},
+        {"text": "Strap dress", "field": "prod_name", "count": 1},
+    ]
+    assert index.suggest("b", groups=["Ladieswear"]) == [{"text": "Black", "field": "colour_group_name", "count": 1}]
+    assert index.suggest("al") == []
+    assert index.metrics()["suggestions"] == 3